@@ -0,0 +1,154 @@
+# agent_logging.py
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER = "agents"
+
+_configure_lock = threading.Lock()
+_listener = None
+
+
+class AgentLogAdapter(logging.LoggerAdapter):
+    """
+    Attaches the agent id, plus any `fields=` keyword, to each record as
+    structured data. Messages use %-style arguments, so nothing is formatted
+    unless the record passes the level check, sampling and reaches the writer.
+    """
+
+    def process(self, msg, kwargs):
+        extra = dict(kwargs.pop("extra", None) or {})
+        extra["agent_id"] = self.extra["agent_id"]
+        extra["fields"] = kwargs.pop("fields", None)
+        kwargs["extra"] = extra
+        return msg, kwargs
+
+
+def get_agent_logger(kind, agent_id):
+    """Logger for one agent instance; `kind` (watcher/analyzer/remediator) selects level and sampling."""
+    return AgentLogAdapter(logging.getLogger(f"{ROOT_LOGGER}.{kind}"), {"agent_id": agent_id})
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, agent_id, message and structured fields."""
+
+    def format(self, record):
+        document = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "agent_id": getattr(record, "agent_id", None),
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            document.update(fields)
+        if record.exc_info:
+            document["exception"] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str, separators=(",", ":"))
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable '<agent id>: <message>' lines, matching the agents' original console output."""
+
+    def format(self, record):
+        agent_id = getattr(record, "agent_id", None)
+        text = f"{agent_id}: {record.getMessage()}" if agent_id else record.getMessage()
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the background listener without formatting them, and drops
+    (and counts) records instead of blocking when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_mapping(text, convert):
+    """Parses 'watcher=DEBUG,analyzer=WARNING' style settings."""
+    mapping = {}
+    for item in (text or "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            mapping[key.strip()] = convert(value.strip())
+    return mapping
+
+
+def configure_agent_logging(level=None, levels=None, sampling=None, stream=None, path=None,
+                            json_lines=None, queue_size=10000):
+    """
+    Routes agent logs through a bounded queue to a background writer thread.
+    Defaults come from AGENT_LOG_LEVEL, AGENT_LOG_LEVELS ('watcher=DEBUG,...'),
+    AGENT_LOG_SAMPLING ('watcher=0.1,...'), AGENT_LOG_FILE and AGENT_LOG_FORMAT
+    ('json' or 'console'). Safe to call more than once; only the first call applies.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return _listener
+
+        level = level or os.environ.get("AGENT_LOG_LEVEL", "INFO")
+        levels = levels if levels is not None else _parse_mapping(os.environ.get("AGENT_LOG_LEVELS"), str.upper)
+        sampling = sampling if sampling is not None else _parse_mapping(os.environ.get("AGENT_LOG_SAMPLING"), float)
+        path = path or os.environ.get("AGENT_LOG_FILE")
+        if json_lines is None:
+            json_lines = os.environ.get("AGENT_LOG_FORMAT", "json") == "json"
+
+        if path:
+            output = logging.FileHandler(path, encoding="utf-8")
+        else:
+            output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonLinesFormatter() if json_lines else ConsoleFormatter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        root.propagate = False
+        root.addHandler(NonBlockingQueueHandler(queue.Queue(maxsize=queue_size)))
+        for kind, kind_level in levels.items():
+            logging.getLogger(f"{ROOT_LOGGER}.{kind}").setLevel(kind_level)
+        for kind, rate in sampling.items():
+            logging.getLogger(f"{ROOT_LOGGER}.{kind}").addFilter(SamplingFilter(rate))
+
+        _listener = QueueListener(root.handlers[-1].queue, output, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def shutdown_agent_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -1,43 +1,83 @@
 # analyzer_agent.py
+import logging
 import time
 import random
+import threading
+
+import numpy as np
+
+try:
+    from Agents.agent_logging import get_agent_logger, configure_agent_logging, shutdown_agent_logging
+    from Agents.azure_connectors import ConnectorError
+except ImportError: # Run directly from the Agents directory
+    from agent_logging import get_agent_logger, configure_agent_logging, shutdown_agent_logging
+    from azure_connectors import ConnectorError
+
+# Static classification tables, built once at import rather than per analysis
+THREAT_TYPES = ["Malware", "SQL Injection", "DDoS", "Zero Day", "Phishing"]
+SEVERITY_LEVELS = {"Low": 0.2, "Medium": 0.4, "High": 0.6, "Critical": 0.8}
+RECOMMENDATION_TEMPLATES = [
+    "Isolate affected system immediately for {threat_type}.",
+    "Block source IP for {threat_type}.",
+    "Perform deep scan for {threat_type}.",
+    "Review user activity for {threat_type}."
+]
+
+SEVERITY_LABELS = list(SEVERITY_LEVELS.keys())
+SEVERITY_WEIGHTS = list(SEVERITY_LEVELS.values())
+SEVERITY_PROBABILITIES = np.array(SEVERITY_WEIGHTS) / sum(SEVERITY_WEIGHTS)
+RECOMMENDATIONS = {
+    threat_type: [template.format(threat_type=threat_type) for template in RECOMMENDATION_TEMPLATES]
+    for threat_type in THREAT_TYPES
+}
+# Row i holds the recommendations for THREAT_TYPES[i], for index-based lookup in batches
+RECOMMENDATION_TABLE = [RECOMMENDATIONS[threat_type] for threat_type in THREAT_TYPES]
 
 class AnalyzerAgent:
     """
     Simulates the Analyzer Agent, responsible for analyzing detected anomalies,
     determining threat severity, and recommending responses.
-    It simulates interaction with Azure Security Center.
+    It simulates interaction with Azure Security Center, or calls it through
+    the given AzureConnectors.
     """
 
-    def __init__(self, agent_id="Analyzer-001"):
+    def __init__(self, agent_id="Analyzer-001", connectors=None):
         self.agent_id = agent_id
+        self.connectors = connectors
         self.status = "IDLE"
-        self.analyses_completed = 0
-        self.accuracy_rate = 95.0 # Starting accuracy
-        print(f"{self.agent_id}: Initialized.")
+        self._lock = threading.Lock() # Guards counters when analyses run on several pipeline workers
+        self.clear_counters()
+        self._rng = np.random.default_rng()
+        self.log = get_agent_logger("analyzer", agent_id)
+        self.log.info("Initialized.")
 
     def start_analysis(self):
         """Simulates starting the analysis process."""
         if self.status == "PROCESSING":
-            print(f"{self.agent_id}: Analysis is already processing.")
+            self.log.info("Analysis is already processing.")
         else:
             self.status = "PROCESSING"
-            print(f"{self.agent_id}: Analysis started.")
+            self.log.info("Analysis started.")
 
     def pause_analysis(self):
         """Simulates pausing the analysis process."""
         if self.status == "PROCESSING":
             self.status = "PAUSED"
-            print(f"{self.agent_id}: Analysis paused.")
+            self.log.info("Analysis paused.")
         else:
-            print(f"{self.agent_id}: Analysis is not active or already paused.")
+            self.log.info("Analysis is not active or already paused.")
 
     def reset_analysis(self):
         """Simulates resetting the analysis process, clearing counts."""
         self.status = "IDLE"
-        self.analyses_completed = 0
-        self.accuracy_rate = 95.0
-        print(f"{self.agent_id}: Analysis reset. Counts cleared.")
+        self.clear_counters()
+        self.log.info("Analysis reset. Counts cleared.")
+
+    def clear_counters(self):
+        """Sets the counters back to their starting values without changing the status."""
+        with self._lock:
+            self.analyses_completed = 0
+            self.accuracy_rate = 95.0 # Starting accuracy
 
     def analyze_anomaly(self, anomaly_details):
         """
@@ -45,35 +85,31 @@ class AnalyzerAgent:
         Simulates threat classification, risk assessment, and response recommendation.
         """
         if self.status != "PROCESSING":
-            print(f"{self.agent_id}: Not currently processing. Start analysis first.")
+            self.log.warning("Not currently processing. Start analysis first.")
             return None
 
-        self.analyses_completed += 1
-        print(f"\n{self.agent_id}: Analyzing anomaly: '{anomaly_details}'...")
+        with self._lock:
+            self.analyses_completed += 1
+            analyses_completed = self.analyses_completed
+        self.log.debug("Analyzing anomaly: '%s'...", anomaly_details)
 
         # Simulate threat classification
-        threat_types = ["Malware", "SQL Injection", "DDoS", "Zero Day", "Phishing"]
-        threat_type = random.choice(threat_types)
+        threat_type = random.choice(THREAT_TYPES)
 
         # Simulate risk assessment
-        severity_levels = {"Low": 0.2, "Medium": 0.4, "High": 0.6, "Critical": 0.8}
-        severity_label = random.choices(list(severity_levels.keys()), weights=list(severity_levels.values()), k=1)[0]
+        severity_label = random.choices(SEVERITY_LABELS, weights=SEVERITY_WEIGHTS, k=1)[0]
         risk_score = random.randint(1, 100)
 
         # Simulate response recommendation
-        recommendations = [
-            f"Isolate affected system immediately for {threat_type}.",
-            f"Block source IP for {threat_type}.",
-            f"Perform deep scan for {threat_type}.",
-            f"Review user activity for {threat_type}."
-        ]
-        response_recommendation = random.choice(recommendations)
+        response_recommendation = random.choice(RECOMMENDATIONS[threat_type])
 
         # Simulate updating accuracy rate
-        if random.random() < 0.05: # Small chance of accuracy dip
-            self.accuracy_rate = max(90.0, self.accuracy_rate - random.uniform(0.1, 0.5))
-        else:
-            self.accuracy_rate = min(99.9, self.accuracy_rate + random.uniform(0.01, 0.1))
+        with self._lock:
+            if random.random() < 0.05: # Small chance of accuracy dip
+                self.accuracy_rate = max(90.0, self.accuracy_rate - random.uniform(0.1, 0.5))
+            else:
+                self.accuracy_rate = min(99.9, self.accuracy_rate + random.uniform(0.01, 0.1))
+            accuracy_rate = self.accuracy_rate
 
         analysis_result = {
             "timestamp": time.time(),
@@ -82,24 +118,108 @@ class AnalyzerAgent:
             "severity": severity_label,
             "risk_score": risk_score,
             "recommendation": response_recommendation,
-            "analyses_completed": self.analyses_completed,
-            "accuracy_rate": round(self.accuracy_rate, 2)
+            "analyses_completed": analyses_completed,
+            "accuracy_rate": round(accuracy_rate, 2)
         }
-        print(f"{self.agent_id}: Analysis complete. Threat: {threat_type} ({severity_label}), Risk: {risk_score}, Recommendation: {response_recommendation}")
+        self.log.info("Analysis complete. Threat: %s (%s), Risk: %d, Recommendation: %s", threat_type, severity_label, risk_score, response_recommendation,
+                      fields={"event": "analysis", "threat_type": threat_type, "severity": severity_label, "risk_score": risk_score})
 
         self._simulate_azure_security_center_update(analysis_result)
         return analysis_result
 
+    def analyze_anomalies(self, anomalies):
+        """
+        Batch counterpart of analyze_anomaly for replaying large anomaly sets.
+        Classification, severity sampling and risk scoring are drawn for the whole
+        batch in one vectorized pass, and Azure Security Center receives a single
+        aggregated update. Counters and the accuracy rate advance exactly as if
+        each anomaly had gone through analyze_anomaly in order.
+        """
+        if self.status != "PROCESSING":
+            self.log.warning("Not currently processing. Start analysis first.")
+            return []
+
+        count = len(anomalies)
+        if count == 0:
+            return []
+        self.log.debug("Analyzing batch of %d anomalies...", count)
+
+        rng = self._rng
+        threat_indices = rng.integers(0, len(THREAT_TYPES), count).tolist()
+        severity_indices = rng.choice(len(SEVERITY_LABELS), size=count, p=SEVERITY_PROBABILITIES).tolist()
+        risk_scores = rng.integers(1, 101, count).tolist()
+        recommendation_indices = rng.integers(0, len(RECOMMENDATION_TEMPLATES), count).tolist()
+        dips = rng.random(count) < 0.05 # Small chance of accuracy dip, as in analyze_anomaly
+        accuracy_steps = np.where(dips, -rng.uniform(0.1, 0.5, count), rng.uniform(0.01, 0.1, count)).tolist()
+        dips = dips.tolist()
+
+        # The accuracy rate is a clamped walk, so it is stepped in order under the lock
+        with self._lock:
+            first_count = self.analyses_completed + 1
+            self.analyses_completed += count
+            accuracy = self.accuracy_rate
+            accuracy_rates = []
+            for dip, step in zip(dips, accuracy_steps):
+                if dip:
+                    accuracy = max(90.0, accuracy + step)
+                else:
+                    accuracy = min(99.9, accuracy + step)
+                accuracy_rates.append(round(accuracy, 2))
+            self.accuracy_rate = accuracy
+
+        timestamp = time.time()
+        results = [
+            {
+                "timestamp": timestamp,
+                "anomaly_details": anomaly_details,
+                "threat_type": THREAT_TYPES[threat_index],
+                "severity": SEVERITY_LABELS[severity_index],
+                "risk_score": risk_score,
+                "recommendation": RECOMMENDATION_TABLE[threat_index][recommendation_index],
+                "analyses_completed": first_count + i,
+                "accuracy_rate": accuracy_rate
+            }
+            for i, (anomaly_details, threat_index, severity_index, risk_score, recommendation_index, accuracy_rate)
+            in enumerate(zip(anomalies, threat_indices, severity_indices, risk_scores, recommendation_indices, accuracy_rates))
+        ]
+        self.log.info("Batch analysis complete. Analyses Completed: %d, Accuracy Rate: %s%%", first_count + count - 1, accuracy_rates[-1],
+                      fields={"event": "batch_analysis", "batch_size": count})
+
+        self._simulate_azure_security_center_batch_update(results, severity_indices)
+        return results
+
     def _simulate_azure_security_center_update(self, analysis_data):
         """
         Simulates pushing security recommendations/alerts to Azure Security Center.
-        In a real scenario, this would use Azure SDKs.
+        Goes through the Azure connectors when they are configured.
+        """
+        if self.connectors is None:
+            self.log.debug("Updating Azure Security Center with recommendation (simulated): %s", analysis_data["recommendation"])
+            return
+        try:
+            self.connectors.get("security_center").post("/recommendations", analysis_data)
+        except ConnectorError as exc:
+            self.log.warning("Azure Security Center update failed: %s", exc)
+
+    def _simulate_azure_security_center_batch_update(self, results, severity_indices):
         """
-        print(f"{self.agent_id}: Updating Azure Security Center with recommendation (simulated): {analysis_data['recommendation']}")
-        # Placeholder for actual Azure Security Center API call
-        # Example: security_center_client.create_recommendation(analysis_data)
+        Simulates pushing one aggregated Security Center update for a whole batch.
+        With Azure connectors configured, this is a single bulk request.
+        """
+        if self.log.isEnabledFor(logging.INFO):
+            severity_counts = dict(zip(SEVERITY_LABELS, np.bincount(severity_indices, minlength=len(SEVERITY_LABELS)).tolist()))
+            summary = ", ".join(f"{label}: {total}" for label, total in severity_counts.items())
+            self.log.info("Updating Azure Security Center with %d recommendations (simulated): %s", len(results), summary,
+                          fields={"event": "security_center_batch", "severity_counts": severity_counts})
+        if self.connectors is not None:
+            try:
+                self.connectors.get("security_center").post("/recommendations/batch", results)
+            except ConnectorError as exc:
+                self.log.warning("Azure Security Center batch update failed: %s", exc)
 
 if __name__ == "__main__":
+    configure_agent_logging(level="DEBUG", json_lines=False)
+    demo_log = logging.getLogger("agents.demo") # Keeps the demo headers in order with the queued agent output
     analyzer = AnalyzerAgent()
     analyzer.start_analysis()
 
@@ -111,10 +231,10 @@ if __name__ == "__main__":
     ]
 
     for i, anomaly in enumerate(sample_anomalies):
-        print(f"\n--- Analysis Cycle {i+1} ---")
+        demo_log.info(f"\n--- Analysis Cycle {i+1} ---")
         result = analyzer.analyze_anomaly(anomaly)
         if result:
-            print(f"Current Analyses Completed: {analyzer.analyses_completed}, Accuracy Rate: {analyzer.accuracy_rate}%")
+            demo_log.info(f"Current Analyses Completed: {analyzer.analyses_completed}, Accuracy Rate: {analyzer.accuracy_rate}%")
         time.sleep(1)
 
     analyzer.pause_analysis()
@@ -123,3 +243,9 @@ if __name__ == "__main__":
     analyzer.reset_analysis()
     analyzer.start_analysis()
     analyzer.analyze_anomaly("New anomaly after reset")
+
+    demo_log.info("\n--- Batch Analysis ---")
+    batch_results = analyzer.analyze_anomalies(sample_anomalies * 250)
+    demo_log.info(f"Batch size: {len(batch_results)}, Analyses Completed: {analyzer.analyses_completed}, Accuracy Rate: {round(analyzer.accuracy_rate, 2)}%")
+
+    shutdown_agent_logging()
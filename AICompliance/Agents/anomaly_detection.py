@@ -0,0 +1,294 @@
+# anomaly_detection.py
+import math
+import threading
+
+import numpy as np
+
+
+def _linear_recurrence(initial, decay, inputs, powers):
+    """
+    Vectorized y[t] = decay * y[t-1] + inputs[t], in chunks of len(powers) so that
+    decay ** -t stays finite. `powers` holds decay ** (1..chunk).
+    """
+    out = np.empty_like(inputs)
+    chunk = len(powers)
+    y = initial
+    for start in range(0, len(inputs), chunk):
+        block = inputs[start:start + chunk]
+        scale = powers[:len(block)]
+        out[start:start + len(block)] = scale * (y + np.cumsum(block / scale))
+        y = out[start + len(block) - 1]
+    return out
+
+
+class QuantileSketch:
+    """
+    Fixed-size log-bucketed histogram (DDSketch style): quantile estimates are within
+    `relative_accuracy` of the true value for values in [min_value, max_value].
+    Values at or below min_value, including zero and negatives, share the first bucket.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-3, max_value=1e9):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self._offset = math.floor(math.log(min_value) / self._log_gamma)
+        self._last = math.ceil(math.log(max_value) / self._log_gamma) - self._offset
+        self.counts = np.zeros(self._last + 1, dtype=np.int64)
+        self.count = 0
+
+    def add(self, value):
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(self._last, math.ceil(math.log(value) / self._log_gamma) - self._offset)
+        self.counts[index] += 1
+        self.count += 1
+
+    def add_many(self, values):
+        clipped = np.maximum(values, self.min_value)
+        indices = np.ceil(np.log(clipped) / self._log_gamma).astype(np.int64) - self._offset
+        indices = np.where(values <= self.min_value, 0, np.clip(indices, 1, self._last))
+        self.counts += np.bincount(indices, minlength=len(self.counts))
+        self.count += len(values)
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1), or None before the first sample."""
+        if self.count == 0:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), q * (self.count - 1), side="right"))
+        if index == 0:
+            return self.min_value
+        return 2 * self.gamma ** (index + self._offset) / (self.gamma + 1)
+
+
+class StreamDetector:
+    """
+    Online anomaly detector for one metric stream, O(1) time and memory per sample.
+    Each sample is scored against the state before it arrives, by two z-scores:
+    one against an exponentially weighted mean/variance (EWMA, smoothing `alpha`)
+    and one against the mean/std of the last `window` samples, which are held in a
+    fixed-size NumPy ring buffer with running sums. The sample's score is the smaller
+    absolute z-score, so both baselines must agree; after `warmup` samples a score
+    of at least `z_threshold` marks an anomaly. A QuantileSketch tracks the
+    stream's distribution.
+    """
+
+    def __init__(self, window=128, alpha=0.05, z_threshold=4.0, warmup=30, min_std=1e-6, chunk=256):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be between 0 and 1")
+        self.window = window
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = max(warmup, 2)
+        self.min_std = min_std
+        self.count = 0
+        self.anomalies = 0
+        self.mean = 0.0 # EWMA mean
+        self.var = 0.0 # EWMA variance
+        self.last_value = None
+        self.last_score = 0.0
+        self._ring = np.zeros(window)
+        self._position = 0
+        self._sum = 0.0
+        self._sum_squares = 0.0
+        self._powers = (1 - alpha) ** np.arange(1, chunk + 1)
+        self.sketch = QuantileSketch()
+
+    def update(self, value):
+        """Scores and absorbs one sample; returns (score, is_anomaly)."""
+        value = float(value)
+        alpha = self.alpha
+        if self.count == 0:
+            self.mean = value
+
+        score = 0.0
+        if self.count >= self.warmup:
+            filled = min(self.count, self.window)
+            window_mean = self._sum / filled
+            window_std = max(self.min_std, math.sqrt(max(0.0, self._sum_squares / filled - window_mean * window_mean)))
+            ewma_std = max(self.min_std, math.sqrt(self.var))
+            score = min(abs(value - window_mean) / window_std, abs(value - self.mean) / ewma_std)
+
+        diff = value - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.var = (1 - alpha) * (self.var + diff * increment)
+
+        position = self._position
+        if self.count >= self.window:
+            evicted = self._ring[position]
+            self._sum -= evicted
+            self._sum_squares -= evicted * evicted
+        self._ring[position] = value
+        self._sum += value
+        self._sum_squares += value * value
+        self._position = position + 1 if position + 1 < self.window else 0
+        self.count += 1
+        if self._position == 0:
+            self._resync_sums() # Bounds floating-point drift in the running sums
+
+        self.sketch.add(value)
+        self.last_value = value
+        self.last_score = score
+        anomaly = score >= self.z_threshold
+        if anomaly:
+            self.anomalies += 1
+        return score, anomaly
+
+    def update_many(self, values):
+        """
+        Vectorized equivalent of calling update() for each sample in order.
+        Returns (scores, anomaly mask) as NumPy arrays.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return np.zeros(0), np.zeros(0, dtype=bool)
+        alpha = self.alpha
+        if self.count == 0:
+            self.mean = float(values[0])
+
+        # EWMA mean and variance, each a first-order linear recurrence
+        means = _linear_recurrence(self.mean, 1 - alpha, alpha * values, self._powers)
+        previous_means = np.concatenate(([self.mean], means[:-1]))
+        diffs = values - previous_means
+        variances = _linear_recurrence(self.var, 1 - alpha, (1 - alpha) * alpha * diffs * diffs, self._powers)
+        previous_variances = np.concatenate(([self.var], variances[:-1]))
+        ewma_z = np.abs(diffs) / np.maximum(self.min_std, np.sqrt(previous_variances))
+
+        # Rolling window statistics from prefix sums over (current window + batch),
+        # shifted by a reference value to limit cancellation
+        filled = min(self.count, self.window)
+        history = self._ordered_window(filled)
+        extended = np.concatenate((history, values)) - self.mean
+        sums = np.concatenate(([0.0], np.cumsum(extended)))
+        sum_squares = np.concatenate(([0.0], np.cumsum(extended * extended)))
+        ends = np.arange(filled, filled + n)
+        starts = np.maximum(ends - self.window, 0)
+        counts = np.maximum(ends - starts, 1)
+        window_means = (sums[ends] - sums[starts]) / counts
+        window_vars = np.maximum(0.0, (sum_squares[ends] - sum_squares[starts]) / counts - window_means * window_means)
+        window_z = np.abs(extended[filled:] - window_means) / np.maximum(self.min_std, np.sqrt(window_vars))
+
+        scores = np.minimum(ewma_z, window_z)
+        sample_numbers = np.arange(self.count, self.count + n)
+        scores[sample_numbers < self.warmup] = 0.0
+        anomalies = scores >= self.z_threshold
+
+        # Absorb the batch: EWMA state, ring buffer, counters and sketch
+        self.mean = float(means[-1])
+        self.var = float(variances[-1])
+        tail = values[-self.window:]
+        slots = (self._position + np.arange(n - len(tail), n)) % self.window
+        self._ring[slots] = tail
+        self._position = (self._position + n) % self.window
+        self.count += n
+        self._resync_sums()
+        self.sketch.add_many(values)
+        self.last_value = float(values[-1])
+        self.last_score = float(scores[-1])
+        self.anomalies += int(anomalies.sum())
+        return scores, anomalies
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "anomalies": self.anomalies,
+            "last_value": self.last_value,
+            "last_score": round(self.last_score, 3),
+            "ewma": round(self.mean, 3),
+            "ewma_std": round(math.sqrt(self.var), 3),
+            "p50": self.sketch.quantile(0.5),
+            "p99": self.sketch.quantile(0.99),
+        }
+
+    def _ordered_window(self, filled):
+        """The last `filled` samples, oldest first."""
+        if filled < self.window:
+            return self._ring[:filled].copy()
+        return np.concatenate((self._ring[self._position:], self._ring[:self._position]))
+
+    def _resync_sums(self):
+        filled = self._ring[:min(self.count, self.window)]
+        self._sum = float(filled.sum())
+        self._sum_squares = float(np.dot(filled, filled))
+
+
+class AnomalyDetectionEngine:
+    """One StreamDetector per named metric, created on first sight; thread-safe."""
+
+    def __init__(self, **detector_options):
+        self._detector_options = detector_options
+        self._detectors = {}
+        self._lock = threading.Lock()
+
+    def detector(self, metric):
+        with self._lock:
+            detector = self._detectors.get(metric)
+            if detector is None:
+                detector = self._detectors[metric] = StreamDetector(**self._detector_options)
+            return detector
+
+    def observe(self, metrics):
+        """Feeds one sample per metric from a {name: value} dict; returns the anomalies found."""
+        found = []
+        with self._lock:
+            for metric, value in metrics.items():
+                detector = self._detectors.get(metric)
+                if detector is None:
+                    detector = self._detectors[metric] = StreamDetector(**self._detector_options)
+                score, anomaly = detector.update(value)
+                if anomaly:
+                    found.append(self._describe(metric, detector, value, score))
+        return found
+
+    def observe_many(self, metric, values):
+        """Feeds a batch of samples for one metric; returns the anomalies found, in order."""
+        detector = self.detector(metric)
+        with self._lock:
+            scores, anomalies = detector.update_many(values)
+            values = np.asarray(values, dtype=np.float64)
+            return [self._describe(metric, detector, values[i], scores[i]) for i in np.flatnonzero(anomalies)]
+
+    def summary(self):
+        with self._lock:
+            return {metric: detector.summary() for metric, detector in self._detectors.items()}
+
+    def reset(self):
+        """Forgets every metric's baseline; detectors start warming up again on the next sample."""
+        with self._lock:
+            self._detectors.clear()
+
+    def _describe(self, metric, detector, value, score):
+        return {
+            "metric": metric,
+            "value": round(float(value), 3),
+            "score": round(float(score), 2),
+            "ewma": round(detector.mean, 3),
+        }
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(7)
+    samples = rng.normal(50.0, 5.0, 1_000_000)
+    spikes = rng.choice(len(samples), 20, replace=False)
+    samples[spikes] += 60.0
+
+    batch_detector = StreamDetector()
+    started = time.perf_counter()
+    for start in range(0, len(samples), 10_000):
+        batch_detector.update_many(samples[start:start + 10_000])
+    batch_seconds = time.perf_counter() - started
+    print(f"update_many: {len(samples) / batch_seconds:,.0f} samples/sec, {batch_detector.anomalies} anomalies "
+          f"({len(spikes)} injected)")
+
+    scalar_detector = StreamDetector()
+    started = time.perf_counter()
+    for value in samples[:200_000].tolist():
+        scalar_detector.update(value)
+    scalar_seconds = time.perf_counter() - started
+    print(f"update: {200_000 / scalar_seconds:,.0f} samples/sec")
+    print(f"Summary: {batch_detector.summary()}")
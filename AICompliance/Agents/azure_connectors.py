@@ -0,0 +1,341 @@
+# azure_connectors.py
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Per-service (requests per second, burst) defaults
+DEFAULT_RATE_LIMITS = {
+    "security_center": (20.0, 40),
+    "sentinel": (20.0, 40),
+    "log_analytics": (10.0, 20),
+    "key_vault": (5.0, 10),
+}
+
+
+class ConnectorError(Exception):
+    """A service call failed: transport error, error response, rate limit or open circuit."""
+
+
+class RateLimitedError(ConnectorError):
+    """The service's token bucket had no token within the allowed wait."""
+
+
+class CircuitOpenError(ConnectorError):
+    """The service's circuit breaker is open after repeated failures."""
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `burst` calls."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Takes one token, waiting up to `timeout` seconds (forever if None); returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets a single trial call through (half-open),
+    closing again on success or reopening on failure.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def cancel(self):
+        """Releases a half-open trial slot taken by allow() when the call was never made."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ConnectionPool:
+    """Bounded pool of keep-alive HTTP connections to one host."""
+
+    def __init__(self, base_url, size=4, timeout=10.0):
+        parts = urlsplit(base_url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Yields an idle connection (or a new one); it is returned to the pool only if the block succeeds."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ConnectorError(f"No free connection to {self.host} within {self.timeout}s")
+        try:
+            try:
+                connection, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self._connection_class(self.host, timeout=self.timeout), False
+                self.created += 1
+            try:
+                yield connection, reused
+            except BaseException:
+                connection.close()
+                raise
+            self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _InFlightCall:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ServiceConnector:
+    """
+    Client for one Azure service: pooled keep-alive connections, a token-bucket
+    rate limit, a circuit breaker, and coalescing of identical concurrent calls
+    (callers asking for the same coalesce key share one in-flight request).
+    """
+
+    def __init__(self, name, pool, rate_limit, breaker, rate_limit_wait=1.0):
+        self.name = name
+        self._pool = pool
+        self._bucket = rate_limit
+        self._breaker = breaker
+        self.rate_limit_wait = rate_limit_wait
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "failures": 0,
+            "coalesced": 0,
+            "rate_limited": 0,
+            "circuit_rejected": 0,
+            "latency_seconds": 0.0,
+        }
+
+    def request(self, method, path, payload=None, body=None, headers=None, coalesce_key=None):
+        """
+        Sends one request and returns the decoded JSON response (or None for an empty body).
+        `payload` is sent as JSON; `body` sends pre-encoded bytes with the given headers.
+        """
+        if coalesce_key is None:
+            return self._request(method, path, payload, body, headers)
+
+        with self._in_flight_lock:
+            call = self._in_flight.get(coalesce_key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[coalesce_key] = _InFlightCall()
+        if not leader:
+            self._count("coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = self._request(method, path, payload, body, headers)
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[coalesce_key]
+            call.done.set()
+
+    def post(self, path, payload, coalesce_key=None):
+        return self.request("POST", path, payload=payload, coalesce_key=coalesce_key)
+
+    def get(self, path):
+        """GETs are idempotent, so identical concurrent GETs always share one request."""
+        return self.request("GET", path, coalesce_key=("GET", path))
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._counters)
+        stats["latency_seconds"] = round(stats["latency_seconds"], 6)
+        stats["circuit"] = self._breaker.state
+        stats["connections_created"] = self._pool.created
+        return stats
+
+    def close(self):
+        self._pool.close()
+
+    def _count(self, counter, amount=1):
+        with self._stats_lock:
+            self._counters[counter] += amount
+
+    def _request(self, method, path, payload, body, headers):
+        if not self._breaker.allow():
+            self._count("circuit_rejected")
+            raise CircuitOpenError(f"{self.name}: circuit open, call rejected")
+        if not self._bucket.acquire(self.rate_limit_wait):
+            self._breaker.cancel()
+            self._count("rate_limited")
+            raise RateLimitedError(f"{self.name}: rate limit of {self._bucket.rate}/s exceeded")
+
+        headers = dict(headers or {})
+        if payload is not None:
+            body = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        started = time.perf_counter()
+        try:
+            status, data = self._send(method, self._pool.base_path + path, body, headers)
+        except ConnectorError:
+            # Local pool exhaustion says nothing about the service's health
+            self._breaker.cancel()
+            raise
+        except (OSError, http.client.HTTPException) as exc:
+            self._breaker.record_failure()
+            self._count("failures")
+            raise ConnectorError(f"{self.name}: {method} {path} failed: {exc}") from exc
+        finally:
+            self._count("requests")
+            self._count("latency_seconds", time.perf_counter() - started)
+
+        if status >= 500 or status == 429:
+            self._breaker.record_failure()
+            self._count("failures")
+            raise ConnectorError(f"{self.name}: {method} {path} returned HTTP {status}")
+        # A 4xx is the caller's fault, not the service's, so it does not trip the breaker
+        self._breaker.record_success()
+        if status >= 400:
+            raise ConnectorError(f"{self.name}: {method} {path} returned HTTP {status}")
+        return json.loads(data) if data else None
+
+    def _send(self, method, path, body, headers):
+        for attempt in range(2):
+            try:
+                with self._pool.connection() as (connection, reused):
+                    connection.request(method, path, body, headers)
+                    response = connection.getresponse()
+                    return response.status, response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server may have closed an idle keep-alive connection; retry once on a fresh one
+                if attempt or not reused:
+                    raise
+
+
+class AzureConnectors:
+    """One ServiceConnector per Azure service, all talking to the same base URL."""
+
+    def __init__(self, base_url, rate_limits=None, pool_size=4, timeout=10.0,
+                 failure_threshold=5, reset_timeout=30.0, rate_limit_wait=1.0):
+        self.base_url = base_url.rstrip("/")
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update(rate_limits or {})
+        self._connectors = {
+            name: ServiceConnector(
+                name,
+                ConnectionPool(f"{self.base_url}/{name}", size=pool_size, timeout=timeout),
+                TokenBucket(rate, burst),
+                CircuitBreaker(failure_threshold, reset_timeout),
+                rate_limit_wait=rate_limit_wait
+            )
+            for name, (rate, burst) in limits.items()
+        }
+
+    def __contains__(self, name):
+        return name in self._connectors
+
+    def get(self, name):
+        return self._connectors[name]
+
+    def stats(self):
+        return {name: connector.stats() for name, connector in self._connectors.items()}
+
+    def close(self):
+        for connector in self._connectors.values():
+            connector.close()
+
+
+def connectors_from_env():
+    """
+    Builds AzureConnectors from AZURE_CONNECTOR_URL (e.g. the local emulator),
+    or returns None to keep the simulated integrations. AZURE_CONNECTOR_RATE_LIMITS
+    overrides per-service rates, e.g. 'sentinel=50,key_vault=2' (burst is twice the rate).
+    """
+    base_url = os.environ.get("AZURE_CONNECTOR_URL")
+    if not base_url:
+        return None
+    rate_limits = {}
+    for item in os.environ.get("AZURE_CONNECTOR_RATE_LIMITS", "").split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rate = float(rate)
+            rate_limits[name.strip()] = (rate, max(1, int(rate * 2)))
+    return AzureConnectors(
+        base_url,
+        rate_limits=rate_limits,
+        pool_size=int(os.environ.get("AZURE_CONNECTOR_POOL_SIZE", 4)),
+        timeout=float(os.environ.get("AZURE_CONNECTOR_TIMEOUT", 10))
+    )
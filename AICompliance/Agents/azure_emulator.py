@@ -0,0 +1,121 @@
+# azure_emulator.py
+"""
+Local stand-in for the Azure services the agents talk to, for offline runs and
+throughput tests. Every request to /<service>/... is answered with a small JSON
+document after the configured latency; a configurable share fails with HTTP 503.
+
+    python azure_emulator.py --port 8765 --latency 0.02 --jitter 0.01 --error-rate 0.05
+    AZURE_CONNECTOR_URL=http://127.0.0.1:8765 python app.py
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICES = ("security_center", "sentinel", "log_analytics", "key_vault")
+
+
+class AzureEmulator:
+    """Threaded HTTP/1.1 (keep-alive) server emulating the Azure service endpoints."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+        emulator = self
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = {service: 0 for service in SERVICES}
+        self.errors = {service: 0 for service in SERVICES}
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; with Nagle and delayed ACKs each keep-alive reply would stall ~40 ms
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with emulator._lock:
+                    emulator.connections += 1
+
+            def do_GET(self):
+                self._handle(None)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                self._handle(json.loads(body) if body else None)
+
+            def _handle(self, payload):
+                service, _, operation = self.path.lstrip("/").partition("/")
+                if service not in SERVICES:
+                    self._reply(404, {"error": f"Unknown service '{service}'"})
+                    return
+                delay = emulator.latency + random.uniform(0, emulator.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                failed = random.random() < emulator.error_rate
+                with emulator._lock:
+                    emulator.requests[service] += 1
+                    if failed:
+                        emulator.errors[service] += 1
+                if failed:
+                    self._reply(503, {"error": "Injected failure"})
+                    return
+                response = {"service": service, "operation": operation, "status": "ok", "timestamp": time.time()}
+                if isinstance(payload, list):
+                    response["accepted"] = len(payload)
+                self._reply(200, response)
+
+            def _reply(self, status, document):
+                body = json.dumps(document).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="azure-emulator", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 503")
+    args = parser.parse_args()
+
+    emulator = AzureEmulator(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Azure emulator listening on {emulator.url}")
+    try:
+        emulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
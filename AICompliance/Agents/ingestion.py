@@ -0,0 +1,297 @@
+# ingestion.py
+import gzip
+import http.client
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("agents.ingestion")
+
+
+class IngestionError(Exception):
+    """Raised by a sender when a batch upload is rejected or cannot be delivered."""
+
+
+class IngestionBuffer:
+    """
+    Accumulates monitoring records and uploads them in gzip-compressed JSON batches.
+    A batch is flushed once it reaches `max_batch_records` or `max_batch_bytes`, or
+    once its oldest record is `max_age` seconds old. Failed uploads are retried with
+    exponential backoff and jitter. Buffered data is capped at `max_buffered_bytes`;
+    when full, the `drop_policy` decides whether the oldest buffered records ("oldest")
+    or the incoming record ("newest") is dropped, so a slow backend never grows memory.
+    `send(body, record_count)` performs the upload and raises on failure.
+    """
+
+    def __init__(self, send, max_batch_records=500, max_batch_bytes=1024 * 1024, max_age=5.0,
+                 max_buffered_bytes=8 * 1024 * 1024, drop_policy="oldest", max_retries=5,
+                 backoff_base=0.5, backoff_max=30.0):
+        if drop_policy not in ("oldest", "newest"):
+            raise ValueError("drop_policy must be 'oldest' or 'newest'")
+        self._send = send
+        self.max_batch_records = max_batch_records
+        self.max_batch_bytes = max_batch_bytes
+        self.max_age = max_age
+        self.max_buffered_bytes = max_buffered_bytes
+        self.drop_policy = drop_policy
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._records = deque() # (enqueued_at, serialized record)
+        self._buffered_bytes = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closing = False
+        self._flush_requested = False
+        self._counters = {
+            "records_added": 0,
+            "records_sent": 0,
+            "records_dropped": 0,
+            "batches_sent": 0,
+            "batches_failed": 0,
+            "retries": 0,
+            "raw_bytes_sent": 0,
+            "compressed_bytes_sent": 0,
+        }
+
+    def add(self, record):
+        """Buffers one record (any JSON-serializable value); returns False if it was dropped."""
+        data = json.dumps(record, default=str, separators=(",", ":")).encode("utf-8")
+        size = len(data)
+        with self._cond:
+            if self._closing:
+                self._counters["records_dropped"] += 1
+                return False
+            if self._buffered_bytes + size > self.max_buffered_bytes:
+                if self.drop_policy == "newest" or size > self.max_buffered_bytes:
+                    self._counters["records_dropped"] += 1
+                    return False
+                while self._records and self._buffered_bytes + size > self.max_buffered_bytes:
+                    self._buffered_bytes -= len(self._records.popleft()[1])
+                    self._counters["records_dropped"] += 1
+            self._records.append((time.monotonic(), data))
+            self._buffered_bytes += size
+            self._counters["records_added"] += 1
+            if self._thread is None:
+                self._start_locked()
+            if len(self._records) >= self.max_batch_records or self._buffered_bytes >= self.max_batch_bytes:
+                self._cond.notify_all()
+        return True
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._start_locked()
+
+    def _start_locked(self):
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="log-ingestion", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout=None):
+        """Wakes the uploader and waits until everything buffered so far has been handed off."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._records and self._thread is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def close(self, timeout=10.0):
+        """Stops accepting records, uploads what is buffered and stops the uploader thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            stats["buffered_records"] = len(self._records)
+            stats["buffered_bytes"] = self._buffered_bytes
+        return stats
+
+    def _batch_ready_locked(self):
+        if not self._records:
+            return False
+        if self._closing or self._flush_requested:
+            return True
+        if len(self._records) >= self.max_batch_records or self._buffered_bytes >= self.max_batch_bytes:
+            return True
+        return time.monotonic() - self._records[0][0] >= self.max_age
+
+    def _take_batch_locked(self):
+        batch = []
+        batch_bytes = 0
+        while self._records and len(batch) < self.max_batch_records:
+            size = len(self._records[0][1])
+            if batch and batch_bytes + size > self.max_batch_bytes:
+                break
+            batch.append(self._records.popleft()[1])
+            batch_bytes += size
+        self._buffered_bytes -= batch_bytes
+        if not self._records:
+            self._flush_requested = False
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._batch_ready_locked():
+                    if self._closing:
+                        self._cond.notify_all()
+                        return
+                    # Sleep until the oldest record ages out, or until add()/flush() wakes us
+                    wait = self.max_age - (time.monotonic() - self._records[0][0]) if self._records else None
+                    self._cond.wait(wait)
+                batch = self._take_batch_locked()
+                self._cond.notify_all()
+            self._upload(batch)
+
+    def _upload(self, batch):
+        raw = b"[" + b",".join(batch) + b"]"
+        body = gzip.compress(raw, compresslevel=6)
+        delay = self.backoff_base
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._send(body, len(batch))
+            except Exception as exc:
+                if attempt == self.max_retries:
+                    logger.error("Log ingestion: dropping batch of %d records after %d attempts: %s",
+                                 len(batch), attempt + 1, exc)
+                    with self._cond:
+                        self._counters["batches_failed"] += 1
+                        self._counters["records_dropped"] += len(batch)
+                    return False
+                pause = delay * random.uniform(0.5, 1.0)
+                logger.warning("Log ingestion: upload failed (%s), retrying in %.2fs", exc, pause)
+                with self._cond:
+                    self._counters["retries"] += 1
+                time.sleep(pause)
+                delay = min(self.backoff_max, delay * 2)
+                continue
+            with self._cond:
+                self._counters["batches_sent"] += 1
+                self._counters["records_sent"] += len(batch)
+                self._counters["raw_bytes_sent"] += len(raw)
+                self._counters["compressed_bytes_sent"] += len(body)
+            return True
+
+
+class HttpLogSink:
+    """
+    Sender that POSTs gzip-compressed JSON batches to an HTTP endpoint, reusing one
+    keep-alive connection between uploads.
+    """
+
+    def __init__(self, url, log_type="AICompliance", timeout=10.0):
+        parts = urlsplit(url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.netloc
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path += "?" + parts.query
+        self._log_type = log_type
+        self._timeout = timeout
+        self._connection = None
+
+    def __call__(self, body, record_count):
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            "Log-Type": self._log_type,
+        }
+        if self._connection is None:
+            self._connection = self._connection_class(self._host, timeout=self._timeout)
+        try:
+            self._connection.request("POST", self._path, body, headers)
+            response = self._connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as exc:
+            self._connection.close()
+            self._connection = None
+            raise IngestionError(f"Upload to {self._host} failed: {exc}") from exc
+        if response.status >= 300:
+            raise IngestionError(f"Upload of {record_count} records rejected with HTTP {response.status}")
+
+
+class LocalLogSink:
+    """
+    Stand-in for the Log Analytics ingestion endpoint, for local runs and tests.
+    Accepts gzip or plain JSON array POSTs and keeps the decoded records in memory.
+    The first `fail_first` requests are answered with HTTP 503 to exercise retries.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fail_first=0):
+        sink = self
+        self.records = []
+        self.batches = 0
+        self.fail_first = fail_first
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with sink._lock:
+                    if sink.fail_first > 0:
+                        sink.fail_first -= 1
+                        status = 503
+                    else:
+                        if self.headers.get("Content-Encoding") == "gzip":
+                            body = gzip.decompress(body)
+                        sink.records.extend(json.loads(body))
+                        sink.batches += 1
+                        status = 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/logs"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="local-log-sink", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sink = LocalLogSink(fail_first=2)
+    buffer = IngestionBuffer(HttpLogSink(sink.start()), max_batch_records=200, max_age=1.0, backoff_base=0.1)
+
+    started = time.perf_counter()
+    for i in range(1000):
+        buffer.add({"timestamp": time.time(), "agent_id": "Watcher-001", "events_processed": i * 100, "latest_anomaly": None})
+    buffer.close()
+    print(f"Buffered 1000 records in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(f"Sink received {len(sink.records)} records in {sink.batches} batches")
+    print(f"Buffer stats: {buffer.stats()}")
+    sink.stop()
@@ -0,0 +1,267 @@
+# pipeline.py
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger("agents.pipeline")
+
+
+class StageStats:
+    """
+    Thread-safe counters for one pipeline stage, including a sliding-window
+    throughput computed from per-second completion buckets.
+    """
+
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._bucket_counts = [0] * window_seconds
+        self._bucket_seconds = [0] * window_seconds
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.emitted = 0
+        self.blocked_seconds = 0.0
+
+    def record_processed(self, now=None):
+        second = int(now if now is not None else time.time())
+        slot = second % self.window_seconds
+        with self._lock:
+            self.processed += 1
+            if self._bucket_seconds[slot] != second:
+                self._bucket_seconds[slot] = second
+                self._bucket_counts[slot] = 0
+            self._bucket_counts[slot] += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def record_emitted(self, blocked_seconds):
+        with self._lock:
+            self.emitted += 1
+            self.blocked_seconds += blocked_seconds
+
+    def throughput(self, now=None):
+        """Items per second over the trailing window."""
+        oldest = int(now if now is not None else time.time()) - self.window_seconds
+        with self._lock:
+            total = sum(count for count, second in zip(self._bucket_counts, self._bucket_seconds) if second > oldest)
+        return total / self.window_seconds
+
+    def snapshot(self):
+        with self._lock:
+            stats = {
+                "processed": self.processed,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "emitted": self.emitted,
+                "blocked_seconds": round(self.blocked_seconds, 3),
+            }
+        stats["throughput_per_sec"] = round(self.throughput(), 3)
+        return stats
+
+
+class PipelineStage:
+    """
+    A bounded input queue drained by a pool of worker threads. Each worker calls
+    `handler(item)` and forwards non-None results to the downstream stage,
+    blocking while the downstream queue is full (backpressure). While `ready()`
+    is false (its agent is paused or reset) workers hold their items instead of
+    handing them over; one the handler still turns away, because the agent paused
+    mid-call or the stage is stopping, counts as dropped rather than processed.
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=100, ready=None):
+        self.name = name
+        self.handler = handler
+        self.ready = ready
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.downstream = None
+        self.listeners = [] # Called with every non-None handler result
+        self.stats = StageStats()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def put(self, item, timeout=None, stop_event=None):
+        """
+        Enqueues an item, waiting for space while the stage is saturated.
+        Returns False if the timeout elapsed or the pipeline is stopping.
+        """
+        stop_event = stop_event or self._stop_event
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not stop_event.is_set():
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            try:
+                if wait <= 0:
+                    self.queue.put_nowait(item) # A spent (or zero) timeout still takes free space
+                else:
+                    self.queue.put(item, timeout=wait)
+                return True
+            except queue.Full:
+                if wait <= 0:
+                    return False
+        return False
+
+    def start(self):
+        self._stop_event.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self):
+        while not self._stop_event.is_set():
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            # Each worker holds its item until the agent is ready again; the rest stay queued
+            while self.ready is not None and not self.ready() and not self._stop_event.wait(0.1):
+                pass
+            try:
+                result = self.handler(item)
+            except Exception:
+                self.stats.record_error()
+                logger.exception("Pipeline stage %s: handler failed", self.name)
+                continue
+            finally:
+                self.queue.task_done()
+            if result is None and self.ready is not None and not self.ready():
+                self.stats.record_dropped()
+                continue
+            self.stats.record_processed()
+            if result is None:
+                continue
+            for listener in self.listeners:
+                try:
+                    listener(result)
+                except Exception:
+                    logger.exception("Pipeline stage %s: result listener failed", self.name)
+            if self.downstream is not None:
+                started = time.monotonic()
+                if self.downstream.put(result, stop_event=self._stop_event):
+                    self.stats.record_emitted(time.monotonic() - started)
+
+    def snapshot(self):
+        stats = self.stats.snapshot()
+        stats.update({
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+        })
+        return stats
+
+
+class AgentPipeline:
+    """
+    Event-driven Watcher -> Analyzer -> Remediator runtime.
+    The Watcher runs its monitoring cycle on a fixed cadence and feeds anomalies
+    into the Analyzer stage; analysis results flow into the Remediator stage.
+    Every hop is a bounded queue, so a slow Remediator throttles the Analyzer,
+    which in turn throttles the Watcher, instead of letting work pile up.
+    With a RemediationExecutor, remediations go through it so duplicate actions
+    on the same target are coalesced and skipped.
+    """
+
+    def __init__(self, watcher, analyzer, remediator, watch_interval=3.0,
+                 analyzer_workers=2, remediator_workers=4, queue_size=100, remediation_executor=None):
+        self.watcher = watcher
+        self.analyzer = analyzer
+        self.remediator = remediator
+        self.remediation_executor = remediation_executor
+        self.watch_interval = watch_interval
+        remediate = remediation_executor.execute if remediation_executor is not None else remediator.execute_remediation
+        self.analyzer_stage = PipelineStage("analyzer", analyzer.analyze_anomaly, analyzer_workers, queue_size,
+                                            ready=lambda: analyzer.status == "PROCESSING")
+        self.remediator_stage = PipelineStage("remediator", remediate, remediator_workers, queue_size,
+                                              ready=lambda: remediator.status == "ACTIVE")
+        self.analyzer_stage.downstream = self.remediator_stage
+        self.watcher_stats = StageStats()
+        self._stop_event = threading.Event()
+        self._watcher_thread = None
+        self._running = False
+
+    def start(self, watch=True):
+        """
+        Starts the stage worker pools and, unless `watch` is False, a thread running
+        the Watcher cycle every `watch_interval` seconds. With watch=False the caller
+        drives the Watcher through run_watch_cycle().
+        """
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        self.remediator_stage.start()
+        self.analyzer_stage.start()
+        if watch:
+            self._watcher_thread = threading.Thread(target=self._watch, name="watcher-cycle", daemon=True)
+            self._watcher_thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stops the Watcher first, then the downstream stages."""
+        self._stop_event.set()
+        if self._watcher_thread is not None:
+            self._watcher_thread.join(timeout)
+            self._watcher_thread = None
+        self._running = False
+        self.analyzer_stage.stop(timeout)
+        self.remediator_stage.stop(timeout)
+        if self.remediation_executor is not None:
+            self.remediation_executor.close()
+
+    def submit(self, anomaly, timeout=None):
+        """
+        Feeds an anomaly straight into the Analyzer stage.
+        Blocks while the stage is saturated; returns False on timeout.
+        """
+        return self.analyzer_stage.put(anomaly, timeout=timeout, stop_event=self._stop_event)
+
+    def run_watch_cycle(self):
+        """Runs one Watcher cycle and feeds its anomaly, if any, to the Analyzer stage."""
+        try:
+            anomaly = self.watcher.run_cycle()
+        except Exception:
+            self.watcher_stats.record_error()
+            logger.exception("Pipeline stage watcher: cycle failed")
+            return
+        self.watcher_stats.record_processed()
+        if anomaly is not None:
+            emit_started = time.monotonic()
+            if self.submit(anomaly):
+                self.watcher_stats.record_emitted(time.monotonic() - emit_started)
+
+    def _watch(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            self.run_watch_cycle()
+            elapsed = time.monotonic() - started
+            self._stop_event.wait(max(0.0, self.watch_interval - elapsed))
+
+    def stats(self):
+        """Per-stage queue depth, worker count, counters and throughput."""
+        watcher = self.watcher_stats.snapshot()
+        watcher["interval_seconds"] = self.watch_interval
+        stats = {
+            "running": self._running,
+            "stages": {
+                "watcher": watcher,
+                "analyzer": self.analyzer_stage.snapshot(),
+                "remediator": self.remediator_stage.snapshot(),
+            }
+        }
+        if self.remediation_executor is not None:
+            stats["remediation"] = self.remediation_executor.stats()
+        return stats
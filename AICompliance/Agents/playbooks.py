@@ -0,0 +1,83 @@
+# playbooks.py
+import json
+import os
+import re
+from functools import lru_cache
+
+DEFAULT_PLAYBOOKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "playbooks.json")
+
+# The Remediator runs exactly one primary action, plus any additional ones
+PRIMARY_ACTIONS = ("quarantine", "block", "recover", "general")
+ADDITIONAL_ACTIONS = ("rotate_secret",)
+
+
+class PlaybookEngine:
+    """
+    Maps (threat type, severity, recommendation) to remediation actions.
+    Recommendation keywords are compiled into one case-insensitive regex of named
+    alternatives, so free text is classified in a single pass; when several primary
+    keywords match, the one listed first wins. Rules keyed by threat type and
+    severity ("*" matches any) live in a dict, so a lookup is at most four probes
+    whatever the number of rules; a matching rule can override the primary action
+    and add actions. Results are memoized per distinct input.
+    """
+
+    def __init__(self, keywords, rules=(), cache_size=4096):
+        self._keyword_actions = []
+        alternatives = []
+        for index, keyword in enumerate(keywords):
+            action = keyword["action"]
+            if action not in PRIMARY_ACTIONS + ADDITIONAL_ACTIONS:
+                raise ValueError(f"Unknown playbook action '{action}'")
+            re.compile(keyword["pattern"]) # Reports a bad pattern before it is merged with the others
+            alternatives.append(f"(?P<k{index}>{keyword['pattern']})")
+            self._keyword_actions.append(action)
+        self._pattern = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+        self._rules = {}
+        for rule in rules:
+            primary = rule.get("primary")
+            additional = tuple(rule.get("additional", ()))
+            if primary is not None and primary not in PRIMARY_ACTIONS:
+                raise ValueError(f"Unknown primary action '{primary}'")
+            for action in additional:
+                if action not in ADDITIONAL_ACTIONS:
+                    raise ValueError(f"Unknown additional action '{action}'")
+            key = (rule.get("threat_type", "*"), rule.get("severity", "*"))
+            if key in self._rules:
+                raise ValueError(f"Duplicate playbook rule for {key}")
+            self._rules[key] = (primary, additional)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, threat_type, severity, recommendation):
+        """Returns (primary action, tuple of additional actions)."""
+        primary_rank = None
+        additional = []
+        if self._pattern is not None:
+            for match in self._pattern.finditer(recommendation):
+                index = int(match.lastgroup[1:])
+                action = self._keyword_actions[index]
+                if action in ADDITIONAL_ACTIONS:
+                    if action not in additional:
+                        additional.append(action)
+                elif primary_rank is None or index < primary_rank:
+                    primary_rank = index
+        primary = self._keyword_actions[primary_rank] if primary_rank is not None else "general"
+
+        for key in ((threat_type, severity), (threat_type, "*"), ("*", severity), ("*", "*")):
+            rule = self._rules.get(key)
+            if rule is not None:
+                rule_primary, rule_additional = rule
+                primary = rule_primary or primary
+                additional.extend(action for action in rule_additional if action not in additional)
+                break
+        return primary, tuple(additional)
+
+
+def load_playbooks(path=None):
+    """Loads playbooks from REMEDIATION_PLAYBOOKS, or the bundled playbooks.json."""
+    path = path or os.environ.get("REMEDIATION_PLAYBOOKS") or DEFAULT_PLAYBOOKS_PATH
+    with open(path, encoding="utf-8") as config_file:
+        config = json.load(config_file)
+    return PlaybookEngine(config.get("keywords", ()), config.get("rules", ()))
@@ -0,0 +1,141 @@
+# remediation_executor.py
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _PendingRemediation:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RemediationExecutor:
+    """
+    Runs RemediatorAgent remediations concurrently with duplicate suppression.
+    Analysis results that share an idempotency key (the same actions on the same
+    target, see RemediatorAgent.idempotency_key) are coalesced while one of them
+    is in flight, and skipped for `idempotency_ttl` seconds once one succeeded, so
+    a burst of analyses about one source triggers a single block. Failed actions
+    are not remembered and run again on the next request. Duplicates return None,
+    like a paused remediator, and do not touch the remediator's counters. Results
+    without a key (no stable target, e.g. Watcher anomalies) always run.
+    `execute` runs on the calling thread (the pipeline's remediator workers);
+    `submit` and `execute_many` use a pool of `workers` threads and block once
+    `queue_size` remediations are waiting for one.
+    """
+
+    def __init__(self, remediator, workers=4, queue_size=1000, idempotency_ttl=300.0, max_keys=100000):
+        self.remediator = remediator
+        self.workers = workers
+        self.idempotency_ttl = idempotency_ttl
+        self.max_keys = max_keys
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._completed = OrderedDict() # Idempotency key -> expiry; the TTL is fixed, so oldest first
+        self._counters = {
+            "executed": 0,
+            "failed": 0,
+            "coalesced": 0,
+            "skipped": 0,
+        }
+
+    def execute(self, analysis_result):
+        """Remediates one analysis result; returns the remediation result, or None for a duplicate."""
+        key = self.remediator.idempotency_key(analysis_result)
+        if key is None:
+            result = self.remediator.execute_remediation(analysis_result)
+            if result is not None:
+                with self._lock:
+                    self._counters["executed"] += 1
+                    if not result["success"]:
+                        self._counters["failed"] += 1
+            return result
+        with self._lock:
+            self._expire(time.monotonic())
+            if key in self._completed:
+                self._counters["skipped"] += 1
+                return None
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _PendingRemediation()
+            else:
+                self._counters["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return None
+
+        try:
+            call.result = self.remediator.execute_remediation(analysis_result)
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if call.result is not None:
+                    self._counters["executed"] += 1
+                    if call.result["success"]:
+                        self._completed[key] = time.monotonic() + self.idempotency_ttl
+                        if len(self._completed) > self.max_keys:
+                            self._completed.popitem(last=False)
+                    else:
+                        self._counters["failed"] += 1
+            call.done.set()
+
+    def submit(self, analysis_result):
+        """Queues a remediation on the worker pool and returns its Future."""
+        self._slots.acquire()
+        try:
+            future = self._executor().submit(self.execute, analysis_result)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def execute_many(self, analysis_results):
+        """Remediates a batch concurrently; results come back in input order, None for duplicates."""
+        futures = [self.submit(result) for result in analysis_results]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Waits for queued remediations, then stops the worker pool."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._in_flight)
+            stats["idempotency_keys"] = len(self._completed)
+        stats["workers"] = self.workers
+        return stats
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="remediation")
+            return self._pool
+
+    def _expire(self, now):
+        completed = self._completed
+        while completed:
+            key, expires = next(iter(completed.items()))
+            if expires > now:
+                break
+            del completed[key]
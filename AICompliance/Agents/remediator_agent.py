@@ -1,43 +1,109 @@
 # remediator_agent.py
+import logging
 import time
 import random
+import threading
+
+try:
+    from Agents.agent_logging import get_agent_logger, configure_agent_logging, shutdown_agent_logging
+    from Agents.azure_connectors import ConnectorError
+    from Agents.ingestion import IngestionBuffer
+    from Agents.playbooks import load_playbooks
+except ImportError: # Run directly from the Agents directory
+    from agent_logging import get_agent_logger, configure_agent_logging, shutdown_agent_logging
+    from azure_connectors import ConnectorError
+    from ingestion import IngestionBuffer
+    from playbooks import load_playbooks
 
 class RemediatorAgent:
     """
     Simulates the Remediator Agent, responsible for executing automated responses
     and remediation actions for detected threats.
-    It simulates interaction with Azure Sentinel and Azure Key Vault.
+    It simulates interaction with Azure Sentinel and Azure Key Vault, or calls
+    them through the given AzureConnectors. Actions are chosen by a PlaybookEngine.
+    With `sentinel_flush_interval` set, Sentinel incident updates are buffered and
+    sent as one batch per flush window instead of one request per action.
     """
 
-    def __init__(self, agent_id="Remediator-001"):
+    def __init__(self, agent_id="Remediator-001", connectors=None, playbooks=None, sentinel_flush_interval=None):
         self.agent_id = agent_id
+        self.connectors = connectors
+        self.playbooks = playbooks or load_playbooks()
+        self.incidents = None
+        if sentinel_flush_interval is not None:
+            self.incidents = IngestionBuffer(self._simulate_azure_sentinel_batch_upload, max_age=sentinel_flush_interval)
+        self._primary_actions = {
+            "quarantine": self._simulate_system_quarantine,
+            "block": self._simulate_automatic_threat_blocking,
+            "recover": self._simulate_recovery_procedures,
+        }
         self.status = "ACTIVE"
-        self.actions_executed = 0
-        self.success_rate = 100.0 # Starting success rate
-        print(f"{self.agent_id}: Initialized.")
+        self._lock = threading.Lock() # Guards counters when remediations run on several pipeline workers
+        self.clear_counters()
+        self.log = get_agent_logger("remediator", agent_id)
+        self.log.info("Initialized.")
 
     def activate_remediation(self):
         """Activates the remediation mode."""
         if self.status == "ACTIVE":
-            print(f"{self.agent_id}: Remediation is already active.")
+            self.log.info("Remediation is already active.")
         else:
             self.status = "ACTIVE"
-            print(f"{self.agent_id}: Remediation mode activated.")
+            self.log.info("Remediation mode activated.")
 
     def pause_remediation(self):
         """Pauses the remediation mode."""
         if self.status == "ACTIVE":
             self.status = "PAUSED"
-            print(f"{self.agent_id}: Remediation mode paused.")
+            self.log.info("Remediation mode paused.")
         else:
-            print(f"{self.agent_id}: Remediation is not active or already paused.")
+            self.log.info("Remediation is not active or already paused.")
 
     def reset_remediation(self):
         """Resets the remediation agent, clearing executed actions."""
         self.status = "PAUSED"
-        self.actions_executed = 0
-        self.success_rate = 100.0
-        print(f"{self.agent_id}: Remediation reset. Actions cleared.")
+        self.clear_counters()
+        self.log.info("Remediation reset. Actions cleared.")
+
+    def clear_counters(self):
+        """Sets the counters back to their starting values without changing the status."""
+        with self._lock:
+            self.actions_executed = 0
+            self.success_rate = 100.0 # Starting success rate
+
+    def close(self):
+        """Sends the Sentinel incident updates still buffered."""
+        if self.incidents is not None:
+            self.incidents.close()
+
+    def idempotency_key(self, analysis_result):
+        """
+        Identifies remediations that repeat the same actions on the same target, so
+        duplicates can be skipped. An explicit "idempotency_key" in the result wins;
+        otherwise the target is its "target" field or the source of a threat passed
+        as the anomaly. A threat without a known source is keyed by its own id, so
+        unrelated threats are never merged. Returns None, meaning no deduplication,
+        when there is no stable target: Watcher anomalies are free-text details.
+        """
+        key = analysis_result.get("idempotency_key")
+        if key is not None:
+            return key
+        target = analysis_result.get("target")
+        if target is None:
+            details = analysis_result.get("anomaly_details")
+            if not isinstance(details, dict):
+                return None
+            target = details.get("source")
+            if target in (None, "", "unknown"):
+                if details.get("id") is None:
+                    return None
+                target = ("threat", details["id"])
+        actions = self.playbooks.resolve(
+            analysis_result.get("threat_type", "Unknown Threat"),
+            analysis_result.get("severity", "Low"),
+            analysis_result.get("recommendation", "No specific recommendation.")
+        )
+        return actions, target
 
     def execute_remediation(self, analysis_result):
         """
@@ -45,7 +111,7 @@ class RemediatorAgent:
         Simulates automatic threat blocking, system quarantine, and recovery procedures.
         """
         if self.status != "ACTIVE":
-            print(f"{self.agent_id}: Remediation is {self.status}. Cannot execute actions.")
+            self.log.warning("Remediation is %s. Cannot execute actions.", self.status)
             return
 
         threat_type = analysis_result.get("threat_type", "Unknown Threat")
@@ -53,74 +119,123 @@ class RemediatorAgent:
         recommendation = analysis_result.get("recommendation", "No specific recommendation.")
         anomaly_details = analysis_result.get("anomaly_details", "No details.")
 
-        self.actions_executed += 1
-        print(f"\n{self.agent_id}: Executing remediation for {threat_type} (Severity: {severity})...")
-        print(f"{self.agent_id}: Recommended action: {recommendation}")
+        with self._lock:
+            self.actions_executed += 1
+        self.log.debug("Executing remediation for %s (Severity: %s)...", threat_type, severity)
+        self.log.debug("Recommended action: %s", recommendation)
 
-        action_taken = ""
         success = True
 
-        if "isolate" in recommendation.lower():
-            action_taken = self._simulate_system_quarantine(anomaly_details)
-        elif "block ip" in recommendation.lower():
-            action_taken = self._simulate_automatic_threat_blocking(anomaly_details)
-        elif "deep scan" in recommendation.lower() or "review user activity" in recommendation.lower():
-            action_taken = self._simulate_recovery_procedures(anomaly_details)
+        primary, additional = self.playbooks.resolve(threat_type, severity, recommendation)
+        handler = self._primary_actions.get(primary)
+        if handler is not None:
+            action_taken = handler(anomaly_details)
         else:
             action_taken = f"Executing general remediation for {threat_type}."
 
-        if random.random() < 0.02: # 2% chance of failure for simulation
-            success = False
-            self.success_rate = max(90.0, self.success_rate - random.uniform(0.5, 2.0))
-            print(f"{self.agent_id}: Action FAILED! {action_taken}")
+        with self._lock:
+            if random.random() < 0.02: # 2% chance of failure for simulation
+                success = False
+                self.success_rate = max(90.0, self.success_rate - random.uniform(0.5, 2.0))
+            else:
+                self.success_rate = min(100.0, self.success_rate + random.uniform(0.01, 0.1))
+            # Read together so concurrent remediations report a consistent pair
+            actions_executed = self.actions_executed
+            success_rate = self.success_rate
+        if success:
+            self.log.info("Action SUCCESS! %s", action_taken,
+                          fields={"event": "remediation", "threat_type": threat_type, "severity": severity, "success": True})
         else:
-            self.success_rate = min(100.0, self.success_rate + random.uniform(0.01, 0.1))
-            print(f"{self.agent_id}: Action SUCCESS! {action_taken}")
+            self.log.error("Action FAILED! %s", action_taken,
+                           fields={"event": "remediation", "threat_type": threat_type, "severity": severity, "success": False})
 
         self._simulate_azure_sentinel_incident_update(threat_type, severity, action_taken, success)
-        if "rotate secret" in recommendation.lower() or "credential" in recommendation.lower():
+        if "rotate_secret" in additional:
             self._simulate_azure_key_vault_rotation(threat_type)
 
-        print(f"{self.agent_id}: Remediation complete. Actions Executed: {self.actions_executed}, Success Rate: {round(self.success_rate, 2)}%")
+        self.log.debug("Remediation complete. Actions Executed: %d, Success Rate: %.2f%%", actions_executed, success_rate)
+        return {
+            "timestamp": time.time(),
+            "threat_type": threat_type,
+            "severity": severity,
+            "action": action_taken,
+            "success": success,
+            "actions_executed": actions_executed,
+            "success_rate": round(success_rate, 2)
+        }
 
     def _simulate_automatic_threat_blocking(self, details):
         """Simulates blocking a malicious threat."""
-        print(f"{self.agent_id}: Implementing automatic threat blocking for: {details}")
+        self.log.debug("Implementing automatic threat blocking for: %s", details)
         # Placeholder for firewall rule update, WAF block, etc.
         return "Threat blocked."
 
     def _simulate_system_quarantine(self, details):
         """Simulates isolating an affected system."""
-        print(f"{self.agent_id}: Initiating system quarantine for affected host due to: {details}")
+        self.log.debug("Initiating system quarantine for affected host due to: %s", details)
         # Placeholder for network segmentation, VM isolation, etc.
         return "System quarantined."
 
     def _simulate_recovery_procedures(self, details):
         """Simulates executing recovery procedures."""
-        print(f"{self.agent_id}: Executing recovery procedures for: {details}")
+        self.log.debug("Executing recovery procedures for: %s", details)
         # Placeholder for system rollback, data restoration, patch deployment, etc.
         return "Recovery procedures initiated."
 
     def _simulate_azure_sentinel_incident_update(self, threat, severity, action, success):
         """
         Simulates updating Azure Sentinel with incident details and remediation actions.
-        In a real scenario, this would use Azure SDKs.
+        Goes through the Azure connectors when they are configured, and through the
+        incident buffer when updates are batched.
         """
         status = "Resolved" if success else "Needs Manual Review"
-        print(f"{self.agent_id}: Updating Azure Sentinel (simulated): Incident for {threat} ({severity}) - Action: '{action}', Status: {status}")
-        # Placeholder for actual Azure Sentinel API call
-        # Example: sentinel_client.update_incident(incident_id, status, action)
+        if self.incidents is not None:
+            if not self.incidents.add({"threat_type": threat, "severity": severity, "action": action, "status": status}):
+                self.log.warning("Azure Sentinel incident buffer full; update dropped.")
+            return
+        if self.connectors is None:
+            self.log.debug("Updating Azure Sentinel (simulated): Incident for %s (%s) - Action: '%s', Status: %s", threat, severity, action, status)
+            return
+        try:
+            self.connectors.get("sentinel").post("/incidents", {
+                "threat_type": threat, "severity": severity, "action": action, "status": status
+            })
+        except ConnectorError as exc:
+            self.log.warning("Azure Sentinel update failed: %s", exc)
+
+    def _simulate_azure_sentinel_batch_upload(self, body, record_count):
+        """
+        Simulates sending one gzip-compressed batch of incident updates to Azure Sentinel.
+        Goes through the Azure connectors when they are configured.
+        """
+        if self.connectors is None:
+            self.log.debug("Updating Azure Sentinel (simulated): %d incidents in one batch (%d bytes compressed)", record_count, len(body))
+            return
+        # Failures propagate so the incident buffer retries the batch
+        self.connectors.get("sentinel").request("POST", "/incidents/batch", body=body, headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip"
+        })
 
     def _simulate_azure_key_vault_rotation(self, threat_type):
         """
         Simulates rotating a secret or certificate in Azure Key Vault.
         Relevant for recovery procedures involving compromised credentials.
         """
-        print(f"{self.agent_id}: Initiating secret rotation in Azure Key Vault (simulated) due to {threat_type}.")
-        # Placeholder for actual Azure Key Vault API call
-        # Example: key_vault_client.rotate_secret('my-compromised-secret')
+        if self.connectors is None:
+            self.log.info("Initiating secret rotation in Azure Key Vault (simulated) due to %s.", threat_type)
+            return
+        self.log.info("Initiating secret rotation in Azure Key Vault due to %s.", threat_type)
+        try:
+            # Concurrent remediations of the same threat type share one rotation request
+            self.connectors.get("key_vault").post("/secrets/rotate", {"reason": threat_type},
+                                                  coalesce_key=("rotate", threat_type))
+        except ConnectorError as exc:
+            self.log.warning("Azure Key Vault rotation failed: %s", exc)
 
 if __name__ == "__main__":
+    configure_agent_logging(level="DEBUG", json_lines=False)
+    demo_log = logging.getLogger("agents.demo") # Keeps the demo headers in order with the queued agent output
     remediator = RemediatorAgent()
     remediator.activate_remediation()
 
@@ -133,7 +248,7 @@ if __name__ == "__main__":
     ]
 
     for i, result in enumerate(sample_analysis_results):
-        print(f"\n--- Remediation Cycle {i+1} ---")
+        demo_log.info(f"\n--- Remediation Cycle {i+1} ---")
         remediator.execute_remediation(result)
         time.sleep(1)
 
@@ -143,3 +258,5 @@ if __name__ == "__main__":
     remediator.reset_remediation()
     remediator.activate_remediation()
     remediator.execute_remediation(sample_analysis_results[1])
+
+    shutdown_agent_logging()
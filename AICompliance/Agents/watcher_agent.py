@@ -1,83 +1,147 @@
+import logging
+import threading
 import time
 import random
+from collections import deque
+
+try:
+    from Agents.agent_logging import get_agent_logger, configure_agent_logging, shutdown_agent_logging
+    from Agents.ingestion import IngestionBuffer
+    from Agents.anomaly_detection import AnomalyDetectionEngine
+except ImportError: # Run directly from the Agents directory
+    from agent_logging import get_agent_logger, configure_agent_logging, shutdown_agent_logging
+    from ingestion import IngestionBuffer
+    from anomaly_detection import AnomalyDetectionEngine
 
 class WatcherAgent:
     """
     Simulates the Watcher Agent, responsible for continuous monitoring,
     traffic analysis, behavioral pattern recognition, and threshold monitoring.
+    Pattern recognition runs a streaming anomaly detector over the traffic it
+    sees and over the system metrics fed to observe_metrics().
     It simulates sending data to Azure Log Analytics.
+    Monitoring records are buffered and uploaded in compressed batches, through
+    the given AzureConnectors if any; pass an IngestionBuffer to send them elsewhere.
     """
 
-    def __init__(self, agent_id="Watcher-001"):
+    def __init__(self, agent_id="Watcher-001", ingestion=None, connectors=None, detector=None):
         self.agent_id = agent_id
+        self.connectors = connectors
         self.status = "ACTIVE"
-        self.events_processed = 0
-        self.anomalies_detected = 0
-        print(f"{self.agent_id}: Initialized.")
+        self._lock = threading.Lock() # Guards counters and pending detections against resets from request threads
+        self.clear_counters()
+        self.log = get_agent_logger("watcher", agent_id)
+        self.ingestion = ingestion or IngestionBuffer(self._simulate_azure_log_analytics_upload)
+        self.detector = detector or AnomalyDetectionEngine()
+        self._detections = deque(maxlen=100) # Detected but not yet reported; oldest dropped first
+        self._latest_metrics = {}
+        self.log.info("Initialized.")
 
     def start_monitoring(self):
         """Simulates starting the monitoring process."""
         if self.status == "PAUSED":
             self.status = "ACTIVE"
-            print(f"{self.agent_id}: Monitoring resumed.")
+            self.log.info("Monitoring resumed.")
         elif self.status == "ACTIVE":
-            print(f"{self.agent_id}: Monitoring is already active.")
+            self.log.info("Monitoring is already active.")
         else:
             self.status = "ACTIVE"
-            print(f"{self.agent_id}: Monitoring started.")
+            self.log.info("Monitoring started.")
 
     def pause_monitoring(self):
         """Simulates pausing the monitoring process."""
         if self.status == "ACTIVE":
             self.status = "PAUSED"
-            print(f"{self.agent_id}: Monitoring paused.")
+            self.log.info("Monitoring paused.")
         else:
-            print(f"{self.agent_id}: Monitoring is not active or already paused.")
+            self.log.info("Monitoring is not active or already paused.")
 
     def reset_monitoring(self):
-        """Simulates resetting the monitoring process, clearing counts."""
+        """Simulates resetting the monitoring process, clearing counts, pending detections and baselines."""
         self.status = "PAUSED"
-        self.events_processed = 0
-        self.anomalies_detected = 0
-        print(f"{self.agent_id}: Monitoring reset. Counts cleared.")
+        self.clear_counters()
+        with self._lock:
+            self._detections.clear()
+            self.detector.reset()
+        self.log.info("Monitoring reset. Counts cleared.")
+
+    def clear_counters(self):
+        """Sets the counters back to their starting values without changing the status."""
+        with self._lock:
+            self.events_processed = 0
+            self.anomalies_detected = 0
+
+    def observe_metrics(self, metrics):
+        """
+        Feeds one sample per metric ({name: value}) to the anomaly detector. Baselines
+        keep learning while monitoring is paused, but anomalies found then are not reported.
+        """
+        self._latest_metrics = metrics
+        with self._lock:
+            anomalies = self.detector.observe(metrics)
+            if self.status == "ACTIVE":
+                self._detections.extend(anomalies)
 
     def _simulate_traffic_analysis(self):
-        """Simulates real-time traffic analysis."""
-        self.events_processed += random.randint(50, 150)
-        print(f"{self.agent_id}: Performing real-time traffic analysis...")
+        """Simulates real-time traffic analysis; the per-cycle event volume is itself a monitored stream."""
+        events = random.randint(50, 150)
+        with self._lock:
+            self.events_processed += events
+            self._detections.extend(self.detector.observe({"events_per_cycle": events}))
+        self.log.debug("Performing real-time traffic analysis...")
 
     def _simulate_behavioral_pattern_recognition(self):
-        """Simulates behavioral pattern recognition for anomalies."""
-        if random.random() < 0.1:  # 10% chance of detecting an anomaly
+        """Reports the oldest anomaly found by the streaming detector since the last cycle, if any."""
+        with self._lock:
+            try:
+                anomaly = self._detections.popleft()
+            except IndexError:
+                return None
             self.anomalies_detected += 1
-            anomaly_details = f"Anomaly detected! Current events processed: {self.events_processed}"
-            print(f"{self.agent_id}: {anomaly_details}")
-            return anomaly_details
-        return None
+        anomaly_details = (f"Anomaly detected! {anomaly['metric']} = {anomaly['value']} "
+                           f"(z-score {anomaly['score']}, EWMA {anomaly['ewma']}). "
+                           f"Current events processed: {self.events_processed}")
+        self.log.warning("%s", anomaly_details, fields={"event": "anomaly", "events_processed": self.events_processed, **anomaly})
+        return anomaly_details
 
     def _simulate_threshold_monitoring(self):
-        """Simulates threshold monitoring for system performance."""
-        cpu_usage = random.randint(30, 95)
-        memory_usage = random.randint(40, 98)
+        """Checks CPU and memory against fixed limits, using observed metrics when available."""
+        metrics = self._latest_metrics
+        if "cpu_usage" in metrics and "memory_usage" in metrics:
+            cpu_usage = round(metrics["cpu_usage"])
+            memory_usage = round(metrics["memory_usage"])
+        else:
+            cpu_usage = random.randint(30, 95)
+            memory_usage = random.randint(40, 98)
         if cpu_usage > 90 or memory_usage > 95:
             alert_message = f"High resource usage alert! CPU: {cpu_usage}%, Memory: {memory_usage}%"
-            print(f"{self.agent_id}: {alert_message}")
+            self.log.warning("%s", alert_message, fields={"event": "threshold_alert", "cpu_usage": cpu_usage, "memory_usage": memory_usage})
             return alert_message
         return None
 
     def _simulate_azure_log_analytics_ingestion(self, data):
+        """Queues a monitoring record for the next Azure Log Analytics batch upload."""
+        if not self.ingestion.add(data):
+            self.log.debug("Log Analytics buffer full; monitoring record dropped.")
+
+    def _simulate_azure_log_analytics_upload(self, body, record_count):
         """
-        Simulates ingesting monitoring data into Azure Log Analytics.
-        In a real scenario, this would use Azure SDKs.
+        Simulates uploading one gzip-compressed batch of monitoring records to Azure Log Analytics.
+        Goes through the Azure connectors when they are configured.
         """
-        print(f"{self.agent_id}: Ingesting data to Azure Log Analytics (simulated): {data[:100]}...")
-        # Placeholder for actual Azure Log Analytics API call
-        # Example: log_client.upload_logs(workspace_id, shared_key, table_name, data)
+        if self.connectors is None:
+            self.log.debug("Uploading %d records to Azure Log Analytics (simulated, %d bytes compressed)", record_count, len(body))
+            return
+        # Failures propagate so the ingestion buffer retries the batch
+        self.connectors.get("log_analytics").request("POST", "/logs", body=body, headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip"
+        })
 
     def run_cycle(self):
         """Runs a single cycle of monitoring activities."""
         if self.status == "ACTIVE":
-            print(f"\n{self.agent_id}: Running monitoring cycle...")
+            self.log.debug("Running monitoring cycle...")
             self._simulate_traffic_analysis()
             anomaly = self._simulate_behavioral_pattern_recognition()
             threshold_alert = self._simulate_threshold_monitoring()
@@ -90,19 +154,22 @@ class WatcherAgent:
                 "latest_anomaly": anomaly,
                 "latest_threshold_alert": threshold_alert
             }
-            self._simulate_azure_log_analytics_ingestion(str(monitoring_data))
-            print(f"{self.agent_id}: Cycle complete. Events Processed: {self.events_processed}, Anomalies Detected: {self.anomalies_detected}")
+            self._simulate_azure_log_analytics_ingestion(monitoring_data)
+            self.log.info("Cycle complete. Events Processed: %d, Anomalies Detected: %d", self.events_processed, self.anomalies_detected,
+                          fields={"event": "cycle", "events_processed": self.events_processed, "anomalies_detected": self.anomalies_detected})
             return anomaly # Return anomaly for Analyzer Agent to pick up
         else:
-            print(f"{self.agent_id}: Monitoring is {self.status}. Skipping cycle.")
+            self.log.debug("Monitoring is %s. Skipping cycle.", self.status)
             return None
 
 if __name__ == "__main__":
+    configure_agent_logging(level="DEBUG", json_lines=False)
+    demo_log = logging.getLogger("agents.demo") # Keeps the demo headers in order with the queued agent output
     watcher = WatcherAgent()
     watcher.start_monitoring()
 
     for i in range(3):
-        print(f"\n--- Monitoring Cycle {i+1} ---")
+        demo_log.info(f"\n--- Monitoring Cycle {i+1} ---")
         watcher.run_cycle()
         time.sleep(1) # Simulate time passing
 
@@ -112,3 +179,6 @@ if __name__ == "__main__":
     watcher.reset_monitoring()
     watcher.start_monitoring()
     watcher.run_cycle()
+
+    watcher.ingestion.close() # Uploads the records still buffered
+    shutdown_agent_logging()
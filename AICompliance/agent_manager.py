@@ -0,0 +1,114 @@
+# agent_manager.py
+import threading
+
+from scheduler import TaskScheduler
+
+# The agent method behind each dashboard control
+AGENT_CONTROLS = {
+    'watcher': {'start': 'start_monitoring', 'pause': 'pause_monitoring', 'reset': 'reset_monitoring'},
+    'analyzer': {'start': 'start_analysis', 'pause': 'pause_analysis', 'reset': 'reset_analysis'},
+    'remediator': {'start': 'activate_remediation', 'pause': 'pause_remediation', 'reset': 'reset_remediation'},
+}
+
+# Live counters reported for each agent
+AGENT_COUNTERS = {
+    'watcher': ('events_processed', 'anomalies_detected'),
+    'analyzer': ('analyses_completed', 'accuracy_rate'),
+    'remediator': ('actions_executed', 'success_rate'),
+}
+
+# Agent status values as the dashboard names them
+DISPLAY_STATUS = {'ACTIVE': 'active', 'PROCESSING': 'active', 'PAUSED': 'paused', 'IDLE': 'standby'}
+
+
+class AgentManager:
+    """
+    Owns the lifecycle of the engine's single Watcher, Analyzer and Remediator,
+    which live for the whole process inside the agent pipeline. The Watcher cycle
+    runs every `watch_interval` seconds on the manager's own scheduler thread, so
+    pipeline backpressure never delays the engine's timers; the Analyzer and
+    Remediator run as results arrive. Start/pause/reset map to each agent's own
+    methods. Counter snapshots read the agents' attributes without taking their
+    locks, so dashboard polling never waits on agent work.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.agents = {
+            'watcher': pipeline.watcher,
+            'analyzer': pipeline.analyzer,
+            'remediator': pipeline.remediator,
+        }
+        self.scheduler = TaskScheduler(name='agent-scheduler')
+        self._watch_task = None
+        self._lock = threading.Lock() # Serializes lifecycle commands
+
+    @property
+    def watch_interval(self):
+        return self.pipeline.watch_interval
+
+    def start(self):
+        """Starts the pipeline stages and the scheduled Watcher cycle."""
+        with self._lock:
+            if self._watch_task is not None:
+                return
+            self.pipeline.start(watch=False)
+            self.scheduler.start()
+            self._watch_task = self.scheduler.call_every(self.watch_interval, self.pipeline.run_watch_cycle)
+
+    def stop(self):
+        with self._lock:
+            if self._watch_task is not None:
+                self._watch_task.cancel()
+                self._watch_task = None
+            # Stopping the pipeline first releases a Watcher cycle blocked on a full Analyzer queue
+            self.pipeline.stop()
+            self.scheduler.stop()
+
+    def set_watch_interval(self, interval):
+        """Changes the Watcher cadence; takes effect from the next cycle."""
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+        with self._lock:
+            self.pipeline.watch_interval = interval
+            if self._watch_task is not None:
+                self._watch_task.cancel()
+                self._watch_task = self.scheduler.call_every(interval, self.pipeline.run_watch_cycle)
+
+    def control(self, name, action):
+        """
+        Runs start, pause or reset on one agent and returns its snapshot.
+        Raises KeyError for an unknown agent and ValueError for an unknown action.
+        """
+        if name not in self.agents:
+            raise KeyError(f"Unknown agent '{name}'")
+        method = AGENT_CONTROLS[name].get(action)
+        if method is None:
+            raise ValueError(f"Unknown action '{action}'")
+        with self._lock:
+            getattr(self.agents[name], method)()
+        return self.snapshot(name)
+
+    def clear_counters(self, name):
+        """Sets an agent's counters to their reset values without changing its status (log replay)."""
+        self.agents[name].clear_counters()
+
+    def running(self, name):
+        return self.agents[name].status in ('ACTIVE', 'PROCESSING')
+
+    def display_status(self, name):
+        status = self.agents[name].status
+        return DISPLAY_STATUS.get(status, status.lower())
+
+    def snapshot(self, name):
+        agent = self.agents[name]
+        snapshot = {'status': self.display_status(name)}
+        for counter in AGENT_COUNTERS[name]:
+            value = getattr(agent, counter)
+            snapshot[counter] = round(value, 2) if isinstance(value, float) else value
+        return snapshot
+
+    def snapshots(self):
+        snapshots = {name: self.snapshot(name) for name in self.agents}
+        snapshots['watcher']['interval_seconds'] = self.watch_interval
+        return snapshots
@@ -1,98 +1,87 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request
 import json
-import random
-import time
-from datetime import datetime, timedelta
+import os
 import threading
-from Agents.watcher_agent import WatcherAgent
-from Agents.analyzer_agent import AnalyzerAgent
-from Agents.remediator_agent import RemediatorAgent
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from engine import Engine, connect_engine
+from Agents.azure_connectors import ConnectorError
+from instrumentation import REQUEST_SECONDS, HistogramForwarder
+from status_stream import StatusBroadcaster
+from status_cache import StatusCache
 
 
 app = Flask(__name__)
 
-# Global state for the application
-app_state = {
-    'threat_level': 'normal',
-    'agents': {
-        'watcher': {'status': 'active', 'last_update': datetime.now()},
-        'analyzer': {'status': 'active', 'last_update': datetime.now()},
-        'remediator': {'status': 'standby', 'last_update': datetime.now()}
-    },
-    'system_metrics': {
-        'cpu_usage': 45,
-        'memory_usage': 62,
-        'network_traffic': 1250,
-        'active_connections': 847,
-        'threats_detected': 0,
-        'threats_blocked': 0
-    },
-    'threats': [],
-    'azure_services': {
-        'sentinel': {
-            'name': 'Azure Sentinel',
-            'status': 'connected',
-            'last_sync': datetime.now(),
-            'alerts': 23,
-            'incidents': 5
-        },
-        'security_center': {
-            'name': 'Azure Security Center',
-            'status': 'connected',
-            'last_sync': datetime.now(),
-            'recommendations': 12,
-            'secure_score': 85
-        },
-        'log_analytics': {
-            'name': 'Azure Log Analytics',
-            'status': 'connected',
-            'last_sync': datetime.now(),
-            'data_ingestion': '2.5GB',
-            'queries_today': 1847
-        },
-        'key_vault': {
-            'name': 'Azure Key Vault',
-            'status': 'connected',
-            'last_sync': datetime.now(),
-            'secrets': 45,
-            'certificates': 8
-        }
-    },
-    'digital_twin': {
-        'application_health': 95,
-        'response_time': 150,
-        'error_rate': 0.02,
-        'throughput': 1200,
-        'security_score': 88
-    }
-}
+# Pushes status deltas to dashboard clients over Server-Sent Events. Streams per process
+# are capped and recycled (0 disables either), so open dashboards cannot hold every worker thread
+status_broadcaster = StatusBroadcaster(
+    max_subscribers=int(os.environ.get('STATUS_STREAM_MAX_CLIENTS', 100)) or None,
+    max_stream_seconds=float(os.environ.get('STATUS_STREAM_MAX_SECONDS', 300)) or None
+)
 
-def call_agents():
-    WatcherAgent()
-    AnalyzerAgent()
-    RemediatorAgent()
+def publish_status(version, payload):
+    status_broadcaster.publish(payload, state_version=version)
 
-def update_metrics():
-    """Background task to update system metrics"""
+def relay_status(poll_interval=0.5):
+    """Worker mode: forwards state changes from the shared engine to this process's SSE clients"""
+    version = None
     while True:
-        time.sleep(3)
-        with app.app_context():
-            metrics = app_state['system_metrics']
-            metrics['cpu_usage'] = max(10, min(90, metrics['cpu_usage'] + random.uniform(-5, 5)))
-            metrics['memory_usage'] = max(20, min(95, metrics['memory_usage'] + random.uniform(-2, 2)))
-            metrics['network_traffic'] = max(100, metrics['network_traffic'] + random.uniform(-100, 100))
-            metrics['active_connections'] = max(100, metrics['active_connections'] + random.randint(-25, 25))
-            
-            # Update digital twin metrics
-            twin = app_state['digital_twin']
-            twin['application_health'] = max(70, min(100, twin['application_health'] + random.uniform(-1, 1)))
-            twin['response_time'] = max(50, min(500, twin['response_time'] + random.uniform(-10, 10)))
-            twin['error_rate'] = max(0, min(5, twin['error_rate'] + random.uniform(-0.01, 0.01)))
-            twin['throughput'] = max(500, twin['throughput'] + random.uniform(-50, 50))
-
-# Start background metrics update
-metrics_thread = threading.Thread(target=update_metrics, daemon=True)
-metrics_thread.start()
+        try:
+            update = engine.status_if_newer(version)
+        except (OSError, EOFError) as exc:
+            print(f"Status relay: engine unreachable: {exc}")
+            update = None
+            time.sleep(5)
+        if update is not None:
+            version, payload = update
+            publish_status(version, payload)
+        time.sleep(poll_interval)
+
+# Worker mode: request latencies are recorded here and added to the engine's histogram, so
+# every worker's /metrics reports the same monotonic totals whichever worker is scraped
+request_timings = HistogramForwarder(REQUEST_SECONDS)
+
+def forward_request_timings(interval=float(os.environ.get('METRICS_FORWARD_SECONDS', 5))):
+    while True:
+        time.sleep(interval)
+        try:
+            request_timings.forward(engine.record_request_timings)
+        except (OSError, EOFError) as exc:
+            print(f"Request timings: engine unreachable: {exc}")
+
+# Either embed the engine or, under a multi-process server, share one engine process
+ENGINE_ADDRESS = os.environ.get('AICOMPLIANCE_ENGINE_ADDRESS')
+if ENGINE_ADDRESS:
+    engine = connect_engine(ENGINE_ADDRESS)
+    threading.Thread(target=relay_status, name='status-relay', daemon=True).start()
+    threading.Thread(target=forward_request_timings, name='request-timings', daemon=True).start()
+else:
+    engine = Engine()
+    engine.add_status_listener(publish_status)
+    engine.start()
+
+# Largest batch /api/threats/bulk accepts in one request
+MAX_BULK_THREATS = int(os.environ.get('BULK_THREATS_MAX', 10000))
+
+# Most Monte Carlo runs one /api/digital_twin/simulate request may ask for
+MAX_TWIN_RUNS = int(os.environ.get('TWIN_MAX_RUNS', 100000))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, endpoint, str(response.status_code))
+    return response
+
+# Serialized /api/status bytes, ETag and gzip body, rebuilt only when the state version changes
+status_cache = StatusCache(lambda version: engine.status_entry_if_newer(version))
 
 @app.route('/')
 def index():
@@ -100,12 +89,43 @@ def index():
 
 @app.route('/api/status')
 def get_status():
-    return jsonify({
-        'threat_level': app_state['threat_level'],
-        'agents': {k: {**v, 'last_update': v['last_update'].isoformat()} for k, v in app_state['agents'].items()},
-        'system_metrics': app_state['system_metrics'],
-        'azure_services': {k: {**v, 'last_sync': v['last_sync'].isoformat()} for k, v in app_state['azure_services'].items()},
-        'digital_twin': app_state['digital_twin']
+    cached = status_cache.get()
+    headers = {
+        'ETag': cached.etag,
+        'Last-Modified': cached.last_modified,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+
+    # If-None-Match takes precedence; a client echoing Last-Modified back is current
+    # unless the state changed after that second
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(cached.etag.strip('"'))
+    elif request.if_modified_since:
+        not_modified = parsedate_to_datetime(cached.last_modified).timestamp() <= request.if_modified_since.timestamp()
+    else:
+        not_modified = False
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    body = cached.body
+    if 'gzip' in request.accept_encodings:
+        body = cached.gzip_body()
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype='application/json', headers=headers)
+
+@app.route('/api/status/stream')
+def stream_status():
+    """Server-Sent Events feed: a full snapshot on connect, then deltas"""
+    if not status_broadcaster.has_payload:
+        publish_status(*engine.status())
+    subscriber = status_broadcaster.subscribe()
+    if subscriber is None:
+        # The dashboard falls back to polling /api/status and retries the stream later
+        return Response('Too many open status streams', status=503, mimetype='text/plain', headers={'Retry-After': '30'})
+    return Response(status_broadcaster.events(subscriber), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
 @app.route('/api/simulate_threat', methods=['POST'])
@@ -113,53 +133,196 @@ def simulate_threat():
     data = request.json
     threat_type = data.get('type', 'unknown')
     severity = data.get('severity', 'low')
-    
-    # Create threat event
-    threat = {
-        'id': f'threat_{int(time.time())}',
-        'type': threat_type,
-        'severity': severity,
-        'timestamp': datetime.now().isoformat(),
-        'description': f'Simulated {threat_type} attack detected',
-        'source': f'192.168.1.{random.randint(1, 255)}',
-        'target': 'web-app-server',
-        'status': 'detected'
-    }
-    
-    app_state['threats'].append(threat)
-    app_state['threat_level'] = severity
-    app_state['system_metrics']['threats_detected'] += 1
-    
-    # Update agent statuses
-    app_state['agents']['watcher']['status'] = 'alert'
-    app_state['agents']['analyzer']['status'] = 'processing'
-    app_state['agents']['remediator']['status'] = 'active'
-    
-    # Schedule automatic resolution
-    def resolve_threat():
-        time.sleep(5)
-        app_state['system_metrics']['threats_blocked'] += 1
-        app_state['threat_level'] = 'normal'
-        for agent in app_state['agents'].values():
-            agent['status'] = 'active'
-            agent['last_update'] = datetime.now()
-    
-    threading.Thread(target=resolve_threat, daemon=True).start()
-    
+    try:
+        resolve_after = min(3600.0, max(0.0, float(data.get('resolve_after', 5))))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'resolve_after must be a number of seconds'}), 400
+
+    threat = engine.simulate_threat(threat_type, severity, resolve_after)
     return jsonify({'status': 'success', 'threat': threat})
 
+# Bulk ingestion body formats, by mimetype
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson')
+
+def parse_threat_records(body, mimetype):
+    """
+    Parses an NDJSON (one object per line) or application/json request body into threat
+    dicts; a JSON body must be an array, so a lone object is not taken for a one-threat batch
+    """
+    text = body.decode('utf-8')
+    if mimetype in NDJSON_MIMETYPES:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        records = json.loads(text)
+        if not isinstance(records, list):
+            raise ValueError('an application/json body must be an array of threats')
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f'record {i + 1} is not a JSON object')
+    return records
+
+@app.route('/api/threats/bulk', methods=['POST'])
+def ingest_threats():
+    """
+    Bulk threat ingestion for replays and capacity tests: a JSON array or NDJSON body.
+    ?resolve_after= sets the resolution delay; ?analyze= also feeds the threats to the
+    agent pipeline, waiting at most that many seconds for queue space.
+    """
+    if request.mimetype != 'application/json' and request.mimetype not in NDJSON_MIMETYPES:
+        return jsonify({'status': 'error', 'message': 'Send application/json (an array) or application/x-ndjson'}), 415
+    try:
+        records = parse_threat_records(request.get_data(), request.mimetype)
+        resolve_after = min(3600.0, max(0.0, float(request.args.get('resolve_after', 5))))
+        analyze = request.args.get('analyze')
+        analyze_timeout = min(30.0, max(0.0, float(analyze))) if analyze is not None else None
+    except (UnicodeDecodeError, ValueError) as exc:
+        return jsonify({'status': 'error', 'message': f'Invalid threat batch: {exc}'}), 400
+    if len(records) > MAX_BULK_THREATS:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_BULK_THREATS} threats per request'}), 413
+
+    return jsonify({'status': 'success', **engine.ingest_threats(records, resolve_after, analyze_timeout)})
+
+def parse_time_param(value):
+    """Accepts epoch seconds or an ISO-8601 timestamp"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 @app.route('/api/threats')
 def get_threats():
-    return jsonify(app_state['threats'][-10:])  # Return last 10 threats
+    """Newest threats first, filtered by severity/type/source/time and paged by cursor"""
+    args = request.args
+    try:
+        limit = min(500, max(1, int(args.get('limit', 10))))
+        cursor = args.get('cursor', type=int) if 'cursor' in args else None
+        if 'cursor' in args and cursor is None:
+            raise ValueError('cursor must be an integer')
+        since = parse_time_param(args.get('since'))
+        until = parse_time_param(args.get('until'))
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': f'Invalid query parameter: {exc}'}), 400
+
+    return jsonify(engine.query_threats(
+        severity=args.get('severity'),
+        type=args.get('type'),
+        source=args.get('source'),
+        since=since,
+        until=until,
+        cursor=cursor,
+        limit=limit
+    ))
+
+@app.route('/api/threats/<threat_id>/hold', methods=['POST'])
+def hold_threat(threat_id):
+    """Cancels the automatic resolution of a threat and keeps it under investigation"""
+    threat = engine.hold_threat(threat_id)
+    if threat is None:
+        return jsonify({'status': 'error', 'message': 'No pending resolution for this threat'}), 404
+    return jsonify({'status': 'success', 'threat': threat})
+
+@app.route('/api/metrics/history')
+def get_metrics_history():
+    """Downsampled metric series for charts: a window (or since/until) and an optional resolution"""
+    args = request.args
+    try:
+        until = parse_time_param(args.get('until')) or time.time()
+        since = parse_time_param(args.get('since'))
+        if since is None:
+            since = until - min(90 * 86400, max(60, float(args.get('window', 3600))))
+        resolution = args.get('resolution')
+        if resolution is not None and resolution not in ('raw', '1m', '1h'):
+            resolution = max(1.0, float(resolution))
+        max_points = min(2000, max(10, int(args.get('max_points', 500))))
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': f'Invalid query parameter: {exc}'}), 400
+
+    metrics = [name for name in args.get('metrics', '').split(',') if name] or None
+    try:
+        return jsonify(engine.metric_history(since, until, metrics=metrics, resolution=resolution, max_points=max_points))
+    except KeyError as exc:
+        return jsonify({'status': 'error', 'message': str(exc.args[0])}), 400
+
+@app.route('/api/agents')
+def get_agents():
+    """Status and live counters of the Watcher, Analyzer and Remediator"""
+    return jsonify(engine.agent_counters())
+
+@app.route('/api/agent_action', methods=['POST'])
+def agent_action():
+    """Starts, pauses or resets an agent; the watcher also accepts a new cycle interval in seconds"""
+    data = request.get_json(silent=True) or {}
+    agent = data.get('agent')
+    try:
+        interval = float(data['interval']) if data.get('interval') is not None else None
+        snapshot = engine.agent_action(agent, data.get('action'), interval=interval)
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f'Unknown agent: {agent}'}), 404
+    except (TypeError, ValueError) as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    return jsonify({'status': 'success', 'agent': {'name': agent, **snapshot}})
+
+@app.route('/api/digital_twin/simulate', methods=['POST'])
+def simulate_twin():
+    """
+    What-if testing on the digital twin: `scenario` lists events applied together
+    (ddos, quarantine, traffic_surge, degrade); returns baseline and predicted distributions
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('scenario', [])
+    if isinstance(events, dict):
+        events = [events]
+    try:
+        runs = min(MAX_TWIN_RUNS, max(1, int(data.get('runs', 10000))))
+        seed = int(data['seed']) if data.get('seed') is not None else None
+        if not isinstance(events, list):
+            raise ValueError('scenario must be an event object or a list of them')
+        prediction = engine.simulate_twin(events, runs=runs, seed=seed)
+    except (TypeError, ValueError) as exc:
+        return jsonify({'status': 'error', 'message': f'Invalid scenario: {exc}'}), 400
+    return jsonify({'status': 'success', **prediction})
+
+@app.route('/api/pipeline')
+def get_pipeline_stats():
+    return jsonify(engine.pipeline_stats())
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus scrape endpoint: request, agent and engine metrics in the text exposition format"""
+    if ENGINE_ADDRESS:
+        # Other workers forward theirs every METRICS_FORWARD_SECONDS
+        request_timings.forward(engine.record_request_timings)
+    return Response(engine.metrics_text(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiler', methods=['POST'])
+def profiler_control():
+    """Starts, stops or resets the sampling profiler; `interval` sets the sampling period in seconds"""
+    data = request.get_json(silent=True) or {}
+    try:
+        interval = float(data['interval']) if data.get('interval') is not None else None
+        status = engine.profiler_control(data.get('action'), interval=interval)
+    except (TypeError, ValueError) as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    return jsonify({'status': 'success', 'profiler': status})
+
+@app.route('/api/profiler/stacks')
+def profiler_stacks():
+    """Sampled stacks in the folded format, ready for flamegraph.pl or speedscope"""
+    return Response(engine.profiler_stacks(), mimetype='text/plain')
 
 @app.route('/api/azure_sync', methods=['POST'])
 def azure_sync():
     service = request.json.get('service')
-    if service in app_state['azure_services']:
-        app_state['azure_services'][service]['last_sync'] = datetime.now()
-        app_state['azure_services'][service]['status'] = 'connected'
+    try:
+        synced = engine.azure_sync(service)
+    except ConnectorError as exc:
+        return jsonify({'status': 'error', 'message': f'{service} synchronization failed: {exc}'}), 502
+    if synced:
         return jsonify({'status': 'success', 'message': f'{service} synchronized successfully'})
     return jsonify({'status': 'error', 'message': 'Service not found'}), 404
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # The reloader would import this module twice and start a second engine on the same event log
+    app.run(debug=True, port=5000, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,100 @@
+# agents.py
+"""
+Microbenchmarks for the agents' hot methods. Agent logs go through the usual
+background queue, as in the app, but are written to the null device; the level
+comes from AGENT_LOG_LEVEL (WARNING by default).
+
+    python -m benchmarks.agents --iterations 20000 --output agents.json
+"""
+import argparse
+import os
+import time
+
+from Agents.watcher_agent import WatcherAgent
+from Agents.analyzer_agent import AnalyzerAgent
+from Agents.remediator_agent import RemediatorAgent
+from Agents.remediation_executor import RemediationExecutor
+from Agents.agent_logging import configure_agent_logging, shutdown_agent_logging
+from benchmarks.common import latency_summary, quiet_stdout, write_results
+
+SAMPLE_ANALYSIS = {
+    "threat_type": "DDoS",
+    "severity": "High",
+    "recommendation": "Block source IP for DDoS.",
+    "anomaly_details": "High traffic from single source."
+}
+
+
+def time_calls(fn, iterations, warmup):
+    """Times each call individually and reports per-call latency and calls/sec."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    perf_counter = time.perf_counter
+    started = perf_counter()
+    for _ in range(iterations):
+        call_started = perf_counter()
+        fn()
+        samples.append(perf_counter() - call_started)
+    wall = perf_counter() - started
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / wall, 2) if wall else 0.0,
+        "latency_us": latency_summary(samples, 1e6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Batch size for AnalyzerAgent.analyze_anomalies")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    # Without this, agent warnings reach stderr synchronously through logging.lastResort inside the timed loops
+    configure_agent_logging(level=os.environ.get("AGENT_LOG_LEVEL", "WARNING"), path=os.devnull)
+    results = {}
+    with quiet_stdout():
+        watcher = WatcherAgent()
+        results["WatcherAgent.run_cycle"] = time_calls(watcher.run_cycle, args.iterations, args.warmup)
+
+        analyzer = AnalyzerAgent()
+        analyzer.start_analysis()
+        anomaly = "High volume of outbound network traffic."
+        results["AnalyzerAgent.analyze_anomaly"] = time_calls(
+            lambda: analyzer.analyze_anomaly(anomaly), args.iterations, args.warmup)
+
+        batch = [anomaly] * args.batch_size
+        batch_iterations = max(1, args.iterations // args.batch_size)
+        batch_result = time_calls(lambda: analyzer.analyze_anomalies(batch), batch_iterations, 1)
+        batch_result["batch_size"] = args.batch_size
+        batch_result["anomalies_per_sec"] = round(batch_result["ops_per_sec"] * args.batch_size, 2)
+        results["AnalyzerAgent.analyze_anomalies"] = batch_result
+
+        remediator = RemediatorAgent()
+        results["RemediatorAgent.execute_remediation"] = time_calls(
+            lambda: remediator.execute_remediation(SAMPLE_ANALYSIS), args.iterations, args.warmup)
+
+        # DDoS bursts: each targets ten new sources, so all but ten results per burst are duplicates
+        burst_remediator = RemediatorAgent(sentinel_flush_interval=1.0)
+        executor = RemediationExecutor(burst_remediator, workers=4)
+        bursts = iter([
+            [dict(SAMPLE_ANALYSIS, target=f"10.{burst}.0.{i % 10}") for i in range(args.batch_size)]
+            for burst in range(batch_iterations + 1)
+        ])
+        burst_result = time_calls(lambda: executor.execute_many(next(bursts)), batch_iterations, 1)
+        burst_result["batch_size"] = args.batch_size
+        burst_result["results_per_sec"] = round(burst_result["ops_per_sec"] * args.batch_size, 2)
+        burst_result["remediation"] = executor.stats()
+        results["RemediationExecutor.execute_many"] = burst_result
+        executor.close()
+        burst_remediator.close()
+    shutdown_agent_logging()
+
+    config = {"iterations": args.iterations, "warmup": args.warmup, "batch_size": args.batch_size}
+    write_results("agents", config, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
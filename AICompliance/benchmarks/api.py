@@ -0,0 +1,124 @@
+# api.py
+"""
+Load test for the Flask API. Runs in-process against the Flask test client by
+default (fully offline), or against a live server with --url.
+
+    python -m benchmarks.api --concurrency 8 --requests 2000 --output api.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, quiet_stdout, write_results
+
+SCENARIOS = {
+    "GET /api/status": ("GET", "/api/status", None),
+    "GET /api/threats": ("GET", "/api/threats?limit=50", None),
+    "POST /api/simulate_threat": ("POST", "/api/simulate_threat", {"type": "ddos", "severity": "low"}),
+    "POST /api/azure_sync": ("POST", "/api/azure_sync", {"service": "sentinel"}),
+}
+
+
+class InProcessClient:
+    """One Flask test client per worker thread."""
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def request(self, method, path, payload):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.open(path, method=method, json=payload)
+        return response.status_code
+
+
+class HttpClient:
+    """Plain urllib client for benchmarking a running server."""
+
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip("/")
+
+    def request(self, method, path, payload):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self._base_url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+
+def run_scenario(client, method, path, payload, total_requests, concurrency):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_request(_):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            status = client.request(method, path, payload)
+        except OSError:
+            status = None
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if status is None or status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(total_requests)))
+    wall = time.perf_counter() - started
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "requests_per_sec": round(total_requests / wall, 2) if wall else 0.0,
+        "latency_ms": latency_summary(latencies, 1e3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Untimed requests per scenario")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Run only these scenarios")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        # Keep benchmark threats out of the real event log, and agent logs out of the timings
+        os.environ.setdefault("EVENT_LOG_DIR", tempfile.mkdtemp(prefix="aicompliance-bench-"))
+        os.environ.setdefault("AGENT_LOG_LEVEL", "WARNING")
+        with quiet_stdout():
+            from app import app
+        client = InProcessClient(app)
+
+    results = {}
+    with quiet_stdout():
+        for name in args.scenario or sorted(SCENARIOS):
+            method, path, payload = SCENARIOS[name]
+            for _ in range(args.warmup):
+                client.request(method, path, payload)
+            results[name] = run_scenario(client, method, path, payload, args.requests, args.concurrency)
+
+    config = {"target": args.url or "in-process", "concurrency": args.concurrency,
+              "requests": args.requests, "warmup": args.warmup}
+    write_results("api", config, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
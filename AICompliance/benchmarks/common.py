@@ -0,0 +1,70 @@
+# common.py
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(samples, scale):
+    """p50/p95/p99/mean/max of `samples` (seconds), multiplied by `scale` (1e3 for ms, 1e6 for us)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    return {
+        "p50": round(percentile(ordered, 0.50) * scale, 3),
+        "p95": round(percentile(ordered, 0.95) * scale, 3),
+        "p99": round(percentile(ordered, 0.99) * scale, 3),
+        "mean": round(sum(ordered) / len(ordered) * scale, 3),
+        "max": round(ordered[-1] * scale, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(suite, config, results, output=None):
+    """Writes a machine-readable result document to `output`, or stdout."""
+    document = {
+        "suite": suite,
+        "meta": {
+            "timestamp": time.time(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": config,
+        "results": results,
+    }
+    text = json.dumps(document, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Wrote {suite} benchmark results to {output}", file=sys.stderr)
+    else:
+        print(text)
+    return document
+
+
+@contextlib.contextmanager
+def quiet_stdout():
+    """Swallows the agents' console output so it does not skew timings."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
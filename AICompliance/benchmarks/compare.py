@@ -0,0 +1,71 @@
+# compare.py
+"""
+Compares two benchmark result files (e.g. from two commits) and exits non-zero
+when any benchmark regressed by more than the threshold.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# (metric path, True if higher is better)
+METRICS = [
+    (("requests_per_sec",), True),
+    (("ops_per_sec",), True),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+    (("latency_us", "p95"), False),
+    (("latency_us", "p99"), False),
+]
+
+
+def lookup(result, path):
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(baseline, candidate, threshold):
+    """Returns a list of (benchmark, metric, baseline, candidate, change_pct, regressed) rows."""
+    rows = []
+    for name, base_result in sorted(baseline["results"].items()):
+        new_result = candidate["results"].get(name)
+        if new_result is None:
+            continue
+        for path, higher_is_better in METRICS:
+            old, new = lookup(base_result, path), lookup(new_result, path)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old * 100
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((name, ".".join(path), old, new, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    if baseline.get("suite") != candidate.get("suite"):
+        sys.exit(f"Cannot compare suite {baseline.get('suite')!r} with {candidate.get('suite')!r}")
+
+    rows = compare(baseline, candidate, args.threshold)
+    for name, metric, old, new, change, regressed in rows:
+        flag = "REGRESSION" if regressed else "ok"
+        print(f"{name:40} {metric:18} {old:>12.3f} -> {new:>12.3f} ({change:+7.1f}%) {flag}")
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# replay.py
+"""
+Replays a recorded threat file (NDJSON, or a JSON array) through /api/threats/bulk
+at a target rate, in-process by default (fully offline) or against a running server
+with --url. Reports the achieved rate, per-batch latency and how far the replay
+fell behind its schedule. Without a file, --synthetic generates threats instead.
+
+    python -m benchmarks.replay threats.ndjson --rate 5000 --batch-size 500
+    python -m benchmarks.replay --synthetic 100000 --rate 20000 --analyze 0.5 --output replay.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, quiet_stdout, write_results
+
+BULK_PATH = "/api/threats/bulk"
+SYNTHETIC_TYPES = ["ddos", "sql_injection", "malware", "zero_day", "phishing"]
+SYNTHETIC_SEVERITIES = ["low", "medium", "high", "critical"]
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yields the elements of the JSON array in text file `f`, reading it in chunks."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace and separators, reading on when the buffer runs out
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise ValueError("unterminated JSON array")
+            buffer, position = f.read(chunk_size), 0
+            eof = not buffer
+            continue
+        if not started:
+            if buffer[position] != "[":
+                raise ValueError("expected a JSON array")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The element may continue in the next chunk
+            chunk = "" if eof else f.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if not eof and (end == len(buffer) or buffer[end] not in " \t\r\n,]"):
+            # A number cut at the chunk boundary ("-1" of "-1.5") decodes early; retry with more input
+            chunk = f.read(chunk_size)
+            if chunk:
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            eof = True
+        yield value
+        buffer, position = buffer[end:], 0
+
+
+def read_records(path):
+    """
+    Yields threats from `path` as encoded JSON lines without loading the file:
+    NDJSON lines pass through unparsed, and JSON array elements are parsed one by one.
+    """
+    with open(path, "rb") as f:
+        head = f.read(1024).lstrip()
+        f.seek(0)
+        if head.startswith(b"["):
+            with open(path, encoding="utf-8") as text:
+                for record in iter_json_array(text):
+                    yield json.dumps(record, separators=(",", ":")).encode("utf-8")
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def synthetic_records(count, sources=256, seed=None):
+    """Yields `count` encoded threats spread over `sources` source addresses."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        source = rng.randrange(sources)
+        yield json.dumps({
+            "type": rng.choice(SYNTHETIC_TYPES),
+            "severity": rng.choice(SYNTHETIC_SEVERITIES),
+            "source": f"10.{source >> 16 & 255}.{source >> 8 & 255}.{source & 255}",
+            "target": "web-app-server",
+        }, separators=(",", ":")).encode("utf-8")
+
+
+def batches(lines, size):
+    iterator = iter(lines)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield b"\n".join(batch)
+
+
+class InProcessClient:
+    """One Flask test client per sender thread."""
+
+    def __init__(self, app):
+        self._app = app
+        self._local = threading.local()
+
+    def post(self, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.post(path, data=body, content_type="application/x-ndjson")
+        return response.status_code, response.get_json()
+
+    def get(self, path):
+        response = self._app.test_client().get(path)
+        return response.get_json()
+
+
+class HttpClient:
+    """Plain urllib client for replaying into a running server."""
+
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip("/")
+
+    def post(self, path, body):
+        request = urllib.request.Request(self._base_url + path, data=body, method="POST",
+                                         headers={"Content-Type": "application/x-ndjson"})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as exc:
+            return exc.code, None
+
+    def get(self, path):
+        with urllib.request.urlopen(self._base_url + path, timeout=30) as response:
+            return json.loads(response.read())
+
+
+def replay(client, bodies, path, rate, concurrency):
+    """
+    Sends each batch when the schedule (`rate` threats per second; 0 for as fast as
+    possible) says it is due, on up to `concurrency` requests in flight.
+    """
+    latencies = []
+    lags = []
+    totals = {"threats": 0, "batches": 0, "errors": 0, "queued_for_analysis": 0}
+    lock = threading.Lock()
+    slots = threading.Semaphore(concurrency)
+
+    def send(body):
+        started = time.perf_counter()
+        try:
+            status, data = client.post(path, body)
+        except (OSError, ValueError):
+            status, data = None, None
+        finally:
+            slots.release()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            totals["batches"] += 1
+            if status != 200:
+                totals["errors"] += 1
+            else:
+                totals["threats"] += data["accepted"]
+                totals["queued_for_analysis"] += data["queued_for_analysis"]
+
+    started = time.perf_counter()
+    scheduled = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for body in bodies:
+            count = body.count(b"\n") + 1
+            if rate:
+                due = started + scheduled / rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            slots.acquire()
+            if rate:
+                lags.append(max(0.0, time.perf_counter() - (started + scheduled / rate)))
+            pool.submit(send, body)
+            scheduled += count
+    wall = time.perf_counter() - started
+    return {
+        "threats_sent": totals["threats"],
+        "batches": totals["batches"],
+        "errors": totals["errors"],
+        "queued_for_analysis": totals["queued_for_analysis"],
+        "target_rate": rate,
+        "achieved_rate": round(totals["threats"] / wall, 2) if wall else 0.0,
+        "wall_seconds": round(wall, 3),
+        "batch_latency_ms": latency_summary(latencies, 1e3),
+        "max_lag_seconds": round(max(lags), 3) if lags else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="Recorded threats: NDJSON or a JSON array")
+    parser.add_argument("--synthetic", type=int, default=10000, help="Threats to generate when no file is given")
+    parser.add_argument("--sources", type=int, default=256, help="Distinct source addresses in synthetic threats")
+    parser.add_argument("--seed", type=int, help="Seed for synthetic threats")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Target threats per second; 0 for unthrottled")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=2, help="Batches in flight at once")
+    parser.add_argument("--loop", type=int, default=1, help="Replay the file this many times")
+    parser.add_argument("--resolve-after", type=float, default=5.0, help="Seconds before replayed threats resolve")
+    parser.add_argument("--analyze", type=float, help="Feed threats to the agent pipeline, waiting up to this many seconds per batch")
+    parser.add_argument("--url", help="Replay into a running server instead of the in-process app")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        # Keep replayed threats out of the real event log, and agent logs out of the timings
+        os.environ.setdefault("EVENT_LOG_DIR", tempfile.mkdtemp(prefix="aicompliance-replay-"))
+        os.environ.setdefault("AGENT_LOG_LEVEL", "WARNING")
+        with quiet_stdout():
+            from app import app
+        client = InProcessClient(app)
+
+    def lines():
+        for _ in range(args.loop):
+            if args.path:
+                yield from read_records(args.path)
+            else:
+                yield from synthetic_records(args.synthetic, args.sources, args.seed)
+
+    path = f"{BULK_PATH}?resolve_after={args.resolve_after}"
+    if args.analyze is not None:
+        path += f"&analyze={args.analyze}"
+    with quiet_stdout():
+        results = replay(client, batches(lines(), args.batch_size), path, args.rate, args.concurrency)
+        results["pipeline"] = client.get("/api/pipeline")
+
+    config = {"target": args.url or "in-process", "source": args.path or "synthetic", "rate": args.rate,
+              "batch_size": args.batch_size, "concurrency": args.concurrency, "loop": args.loop,
+              "analyze": args.analyze}
+    write_results("replay", config, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
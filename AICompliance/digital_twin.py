@@ -0,0 +1,208 @@
+# digital_twin.py
+import numpy as np
+
+# Mirrored components in request order, sized for REFERENCE_LOAD. Capacity is
+# requests/second per node; latency is per-request service time in milliseconds
+# when the component is idle.
+REFERENCE_LOAD = 1200.0
+DEFAULT_TOPOLOGY = {
+    'api_gateway': {'nodes': 2, 'capacity': 1500.0, 'latency_ms': 10.0},
+    'web_server': {'nodes': 4, 'capacity': 400.0, 'latency_ms': 60.0},
+    'database': {'nodes': 2, 'capacity': 600.0, 'latency_ms': 40.0},
+}
+COMPONENTS = tuple(DEFAULT_TOPOLOGY)
+
+# Share of web requests that query the database
+DATABASE_FRACTION = 0.6
+
+# Attack traffic per DDoS severity, as a multiple of the legitimate load
+DDOS_INTENSITY = {'low': 0.5, 'medium': 2.0, 'high': 5.0, 'critical': 10.0}
+
+# Queueing delay stops growing here: requests beyond capacity are dropped, not queued forever
+MAX_QUEUE_FACTOR = 50.0
+
+# Run-to-run variation: mean-one lognormal sigmas for load, attack volume and latency, normal sigma for capacity
+LOAD_SIGMA = 0.1
+ATTACK_SIGMA = 0.3
+LATENCY_SIGMA = 0.1
+CAPACITY_SIGMA = 0.05
+
+PERCENTILES = (5, 50, 95, 99)
+
+
+def _component(event):
+    component = event.get('component')
+    if component not in COMPONENTS:
+        raise ValueError(f"Unknown component '{component}'; expected one of {', '.join(COMPONENTS)}")
+    return component
+
+
+def _mean_one_lognormal(rng, sigma, size):
+    return rng.lognormal(-sigma * sigma / 2.0, sigma, size)
+
+
+class TwinScenario:
+    """
+    A what-if built from one or more events applied together:
+
+        {'type': 'ddos', 'severity': 'high', 'mitigation': 0.5}  # attack traffic, half filtered at the gateway
+        {'type': 'quarantine', 'component': 'database', 'nodes': 1}
+        {'type': 'traffic_surge', 'multiplier': 1.5}
+        {'type': 'degrade', 'component': 'web_server', 'capacity': 0.7}  # nodes run at 70% capacity
+
+    Raises ValueError for an unknown event type or an invalid parameter.
+    """
+
+    def __init__(self, events=()):
+        self.events = list(events)
+        self.attack_intensity = 0.0
+        self.attack_mitigation = 0.0
+        self.load_multiplier = 1.0
+        self.removed_nodes = dict.fromkeys(COMPONENTS, 0)
+        self.capacity_factor = dict.fromkeys(COMPONENTS, 1.0)
+        for event in self.events:
+            self._apply(event)
+
+    def _apply(self, event):
+        if not isinstance(event, dict):
+            raise ValueError('each scenario event must be an object')
+        kind = event.get('type')
+        if kind == 'ddos':
+            severity = str(event.get('severity', 'medium')).lower()
+            if severity not in DDOS_INTENSITY:
+                raise ValueError(f"Unknown DDoS severity '{severity}'; expected one of {', '.join(DDOS_INTENSITY)}")
+            mitigation = float(event.get('mitigation', 0.0))
+            if not 0.0 <= mitigation <= 1.0:
+                raise ValueError('mitigation must be between 0 and 1')
+            self.attack_intensity += DDOS_INTENSITY[severity]
+            self.attack_mitigation = max(self.attack_mitigation, mitigation)
+        elif kind == 'quarantine':
+            component = _component(event)
+            nodes = int(event.get('nodes', 1))
+            if nodes < 0:
+                raise ValueError('nodes must not be negative')
+            self.removed_nodes[component] += nodes
+        elif kind == 'traffic_surge':
+            multiplier = float(event.get('multiplier', 2.0))
+            if multiplier <= 0:
+                raise ValueError('multiplier must be positive')
+            self.load_multiplier *= multiplier
+        elif kind == 'degrade':
+            component = _component(event)
+            capacity = float(event.get('capacity', 0.5))
+            if not 0.0 <= capacity <= 1.0:
+                raise ValueError('capacity must be between 0 and 1')
+            self.capacity_factor[component] *= capacity
+        else:
+            raise ValueError(f"Unknown scenario type '{kind}'")
+
+
+class DigitalTwinModel:
+    """
+    Monte Carlo model of the mirrored application: requests pass the API gateway,
+    then the web servers, and DATABASE_FRACTION of them query the database. Each
+    component is a pool of identical nodes. Below capacity, its latency grows with
+    utilization as in an M/M/1 queue, 1 / (1 - utilization). Above capacity, the
+    excess requests fail. All runs of a simulation are evaluated at once as numpy
+    arrays, so ten thousand runs take a few milliseconds.
+
+    Every run of the baseline and the scenario uses the same random draws, so the
+    difference between the two distributions comes from the scenario, not from noise.
+
+    The baseline is calibrated to the twin's current state. The topology describes
+    the system as provisioned for `reference_load`. Node capacities are scaled by
+    the observed throughput over that load, so each component keeps its designed
+    utilization, and the baseline's mean throughput and error rate match the twin
+    up to the few runs whose random load peaks exceed capacity. Latencies are then
+    scaled so that the baseline's mean response time equals the twin's.
+    """
+
+    def __init__(self, topology=None, database_fraction=DATABASE_FRACTION, reference_load=REFERENCE_LOAD):
+        self.topology = {name: dict(spec) for name, spec in (topology or DEFAULT_TOPOLOGY).items()}
+        self.database_fraction = database_fraction
+        self.reference_load = reference_load
+
+    def simulate(self, twin, scenario, runs=10000, seed=None, bins=20):
+        """
+        Runs the baseline and the scenario `runs` times each, starting from the twin
+        state (response_time, error_rate, throughput). Returns the distributions of
+        response_time (ms), error_rate (%) and throughput (successful requests/second),
+        and how often each component ran over capacity.
+        """
+        if runs < 1:
+            raise ValueError('runs must be at least 1')
+        rng = np.random.default_rng(seed)
+        legit_load = max(1.0, float(twin['throughput']))
+        base_error = max(0.0, float(twin['error_rate'])) / 100.0
+        capacity_scale = legit_load / self.reference_load
+
+        draws = {
+            'load': _mean_one_lognormal(rng, LOAD_SIGMA, runs),
+            'attack': _mean_one_lognormal(rng, ATTACK_SIGMA, runs),
+            'latency': _mean_one_lognormal(rng, LATENCY_SIGMA, runs),
+            'capacity': {name: np.clip(rng.normal(1.0, CAPACITY_SIGMA, runs), 0.5, None) for name in self.topology},
+        }
+        baseline = self._evaluate(TwinScenario(), draws, legit_load, base_error, capacity_scale)
+        predicted = self._evaluate(scenario, draws, legit_load, base_error, capacity_scale)
+        latency_scale = max(0.0, float(twin['response_time'])) / baseline['response_time'].mean()
+        baseline['response_time'] *= latency_scale
+        predicted['response_time'] *= latency_scale
+        return {
+            'runs': runs,
+            'scenario': scenario.events,
+            'baseline': self._summarize(baseline, bins),
+            'predicted': self._summarize(predicted, bins),
+        }
+
+    def _path(self):
+        """(component, share of requests reaching it)"""
+        return (('api_gateway', 1.0), ('web_server', 1.0), ('database', self.database_fraction))
+
+    def _evaluate(self, scenario, draws, legit_load, base_error, capacity_scale):
+        legit = legit_load * scenario.load_multiplier * draws['load']
+        attack = legit_load * scenario.attack_intensity * draws['attack']
+        offered = legit + attack
+        # Mitigation drops attack traffic at the gateway before it takes capacity
+        load = legit + attack * (1.0 - scenario.attack_mitigation)
+
+        served = load
+        latency = np.zeros_like(load)
+        overloaded = {}
+        for name, share in self._path():
+            spec = self.topology[name]
+            nodes = max(0, spec['nodes'] - scenario.removed_nodes.get(name, 0))
+            capacity = nodes * spec['capacity'] * capacity_scale * scenario.capacity_factor[name] * draws['capacity'][name]
+            demand = served * share
+            utilization = np.divide(demand, capacity, out=np.full_like(demand, np.inf), where=capacity > 0)
+            dropped = np.maximum(demand - capacity, 0.0)
+            served = served - dropped
+            queue_factor = 1.0 / np.maximum(1.0 - utilization, 1.0 / MAX_QUEUE_FACTOR)
+            latency += share * spec['latency_ms'] * queue_factor
+            overloaded[name] = utilization >= 1.0
+
+        # Drops hit legitimate and attack requests alike; users only see the legitimate ones
+        success = np.divide(served, load, out=np.zeros_like(load), where=load > 0) * (1.0 - base_error)
+        return {
+            'response_time': latency * draws['latency'], # Unscaled; simulate() calibrates it
+            'error_rate': (1.0 - success) * 100.0,
+            'throughput': legit * success,
+            'offered_load': offered,
+            'overloaded': overloaded,
+        }
+
+    @staticmethod
+    def _summarize(outcome, bins):
+        summary = {}
+        for metric in ('response_time', 'error_rate', 'throughput', 'offered_load'):
+            values = outcome[metric]
+            counts, edges = np.histogram(values, bins=bins)
+            summary[metric] = {
+                'mean': round(float(values.mean()), 3),
+                'std': round(float(values.std()), 3),
+                'min': round(float(values.min()), 3),
+                'max': round(float(values.max()), 3),
+                **{f'p{p}': round(float(v), 3) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+                'histogram': {'edges': np.round(edges, 3).tolist(), 'counts': counts.tolist()},
+            }
+        summary['overload_probability'] = {name: round(float(flags.mean()), 4) for name, flags in outcome['overloaded'].items()}
+        return summary
@@ -0,0 +1,687 @@
+# engine.py
+import argparse
+import os
+import random
+import secrets
+import threading
+import time
+from datetime import datetime
+from multiprocessing.managers import BaseManager
+from Agents.watcher_agent import WatcherAgent
+from Agents.analyzer_agent import AnalyzerAgent
+from Agents.remediator_agent import RemediatorAgent
+from Agents.pipeline import AgentPipeline
+from Agents.remediation_executor import RemediationExecutor
+from Agents.agent_logging import configure_agent_logging
+from Agents.ingestion import IngestionBuffer, HttpLogSink
+from Agents.azure_connectors import connectors_from_env
+from threat_store import ThreatStore, ThreatIdGenerator
+from event_log import EventLog
+from scheduler import TaskScheduler
+from state import AppState
+from metrics_history import MetricsHistory
+from agent_manager import AGENT_COUNTERS, AgentManager
+from instrumentation import REGISTRY, REQUEST_SECONDS, SamplingProfiler, instrument_agent, timed
+from digital_twin import DigitalTwinModel, TwinScenario
+
+DEFAULT_EVENT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'events')
+
+# Methods request workers may call on a remote engine
+ENGINE_METHODS = (
+    'status', 'status_if_newer', 'status_entry_if_newer', 'simulate_threat', 'ingest_threats', 'hold_threat',
+    'query_threats', 'azure_sync', 'pipeline_stats', 'metric_history',
+    'agent_action', 'agent_counters', 'metrics_text', 'record_request_timings', 'profiler_control',
+    'profiler_stacks', 'simulate_twin'
+)
+
+
+METRICS_INTERVAL = 3 # Seconds between metrics ticks
+
+ENGINE_TASK_SECONDS = REGISTRY.histogram(
+    'aicompliance_engine_task_duration_seconds', 'Time spent in periodic engine tasks.', ('task',))
+
+# Metric streams recorded in the history store and fed to the Watcher's anomaly detector
+MONITORED_METRICS = {
+    'system_metrics': ('cpu_usage', 'memory_usage', 'network_traffic', 'active_connections'),
+    'digital_twin': ('application_health', 'response_time', 'error_rate', 'throughput'),
+}
+
+
+def initial_state():
+    """Global state for the application at startup"""
+    return {
+        'threat_level': 'normal',
+        'agents': {
+            'watcher': {'status': 'active', 'last_update': datetime.now()},
+            'analyzer': {'status': 'active', 'last_update': datetime.now()},
+            'remediator': {'status': 'standby', 'last_update': datetime.now()}
+        },
+        'system_metrics': {
+            'cpu_usage': 45,
+            'memory_usage': 62,
+            'network_traffic': 1250,
+            'active_connections': 847,
+            'threats_detected': 0,
+            'threats_blocked': 0
+        },
+        'azure_services': {
+            'sentinel': {
+                'name': 'Azure Sentinel',
+                'status': 'connected',
+                'last_sync': datetime.now(),
+                'alerts': 23,
+                'incidents': 5
+            },
+            'security_center': {
+                'name': 'Azure Security Center',
+                'status': 'connected',
+                'last_sync': datetime.now(),
+                'recommendations': 12,
+                'secure_score': 85
+            },
+            'log_analytics': {
+                'name': 'Azure Log Analytics',
+                'status': 'connected',
+                'last_sync': datetime.now(),
+                'data_ingestion': '2.5GB',
+                'queries_today': 1847
+            },
+            'key_vault': {
+                'name': 'Azure Key Vault',
+                'status': 'connected',
+                'last_sync': datetime.now(),
+                'secrets': 45,
+                'certificates': 8
+            }
+        },
+        'digital_twin': {
+            'application_health': 95,
+            'response_time': 150,
+            'error_rate': 0.02,
+            'throughput': 1200,
+            'security_score': 88
+        }
+    }
+
+
+def call_agents(connectors=None):
+    """Builds the agents and links them Watcher -> Analyzer -> Remediator"""
+    # Monitoring records go to a real ingestion endpoint when one is configured, else to the simulated upload
+    log_analytics_url = os.environ.get('LOG_ANALYTICS_URL')
+    watcher = WatcherAgent(ingestion=IngestionBuffer(
+        HttpLogSink(log_analytics_url),
+        max_age=float(os.environ.get('LOG_ANALYTICS_FLUSH_SECONDS', 5))
+    ) if log_analytics_url else None, connectors=connectors)
+    analyzer = AnalyzerAgent(connectors=connectors)
+    # Sentinel incident updates go out in one batch per flush window
+    remediator = RemediatorAgent(connectors=connectors,
+                                 sentinel_flush_interval=float(os.environ.get('REMEDIATION_FLUSH_SECONDS', 1)))
+    # Latency histograms for the agents' hot methods; must wrap them before the pipeline binds them
+    instrument_agent(watcher, 'watcher', ('run_cycle', 'observe_metrics'))
+    instrument_agent(analyzer, 'analyzer', ('analyze_anomaly', 'analyze_anomalies'))
+    instrument_agent(remediator, 'remediator', ('execute_remediation',))
+    analyzer.start_analysis()
+    remediator_workers = int(os.environ.get('PIPELINE_REMEDIATOR_WORKERS', 4))
+    return AgentPipeline(
+        watcher, analyzer, remediator,
+        watch_interval=float(os.environ.get('PIPELINE_WATCH_INTERVAL', 3)),
+        analyzer_workers=int(os.environ.get('PIPELINE_ANALYZER_WORKERS', 2)),
+        remediator_workers=remediator_workers,
+        queue_size=int(os.environ.get('PIPELINE_QUEUE_SIZE', 100)),
+        remediation_executor=RemediationExecutor(
+            remediator, workers=remediator_workers,
+            idempotency_ttl=float(os.environ.get('REMEDIATION_IDEMPOTENCY_TTL', 300))
+        )
+    )
+
+
+def build_status_payload(snapshot):
+    """Builds the /api/status payload from one consistent state snapshot"""
+    return {
+        'threat_level': snapshot['threat_level'],
+        'agents': {k: {**v, 'last_update': v['last_update'].isoformat()} for k, v in snapshot['agents'].items()},
+        'system_metrics': dict(snapshot['system_metrics']),
+        'azure_services': {k: {**v, 'last_sync': v['last_sync'].isoformat()} for k, v in snapshot['azure_services'].items()},
+        'digital_twin': dict(snapshot['digital_twin'])
+    }
+
+
+class Engine:
+    """
+    Owns all mutable dashboard state and the background work that changes it:
+    the copy-on-write app state, threat store, event log, scheduler and agent
+    pipeline. Exactly one engine runs per deployment. The Flask app either embeds
+    it (single process) or reaches it through EngineManager (multi-process), so
+    every public method takes and returns plain picklable values.
+    """
+
+    def __init__(self, event_log_dir=None):
+        # Agent logs go through a background writer; levels and sampling come from AGENT_LOG_* settings
+        configure_agent_logging()
+        self.state = AppState(initial_state())
+        # Identifies this engine run; state versions start over on restart
+        self.instance_id = os.urandom(4).hex()
+        # Retains the most recent threats, indexed for /api/threats filtering
+        self.threat_store = ThreatStore(capacity=int(os.environ.get('THREAT_STORE_CAPACITY', 10000)))
+        # Monotonic, collision-free threat ids, also across restarts
+        self.threat_ids = ThreatIdGenerator()
+        # Durable record of threats, resolutions, analyses and remediations; replayed on startup
+        self.event_log = EventLog(event_log_dir or os.environ.get('EVENT_LOG_DIR', DEFAULT_EVENT_LOG_DIR))
+        # Single timer thread owning every delayed resolution and periodic task
+        self.scheduler = TaskScheduler()
+        # Raw, 1-minute and 1-hour series of the monitored metrics for the dashboard charts
+        self.history = MetricsHistory(
+            [name for names in MONITORED_METRICS.values() for name in names],
+            raw_interval=METRICS_INTERVAL
+        )
+        # Pooled, rate-limited clients for the Azure services; None keeps the simulated integrations
+        self.connectors = connectors_from_env()
+        self.pipeline = call_agents(self.connectors)
+        self.pipeline.analyzer_stage.listeners.append(lambda result: self.event_log.append('analysis', result))
+        self.pipeline.remediator_stage.listeners.append(lambda result: self.event_log.append('remediation', result))
+        # Start/pause/reset, counters and the scheduled Watcher cycle for the pipeline's agents
+        self.agents = AgentManager(self.pipeline)
+        # Monte Carlo what-if model of the mirrored web server, database and API gateway
+        self.twin_model = DigitalTwinModel()
+        # Off until toggled through profiler_control
+        self.profiler = SamplingProfiler()
+        self._register_metrics()
+        self._pending_resolutions = {}
+        self._resolution_seq = 0 # Sequence number of the newest resolution counted in threats_blocked
+        # Serializes applying events, so snapshots see the state, threat store and sequence at one point
+        self._events_lock = threading.RLock()
+        self._pending_resolutions_lock = threading.Lock()
+        self._status_listeners = []
+        self._started = False
+
+    def start(self):
+        """Rebuilds state from disk, then starts the event log, scheduler and pipeline"""
+        if self._started:
+            return
+        self._started = True
+        self._recover_state()
+        self.event_log.start()
+        self.scheduler.call_every(METRICS_INTERVAL, timed(ENGINE_TASK_SECONDS, 'update_metrics')(self._update_metrics))
+        self.scheduler.start()
+        self._sync_agent_status()
+        self.agents.start()
+
+    def stop(self):
+        self.profiler.stop()
+        self.agents.stop()
+        self.pipeline.watcher.ingestion.close()
+        self.pipeline.remediator.close()
+        if self.connectors is not None:
+            self.connectors.close()
+        self.scheduler.stop()
+        self.event_log.close()
+        self._started = False
+
+    def add_status_listener(self, listener):
+        """Registers listener(version, payload), called in-process after every state change"""
+        self._status_listeners.append(listener)
+
+    def _notify_status(self):
+        if self._status_listeners:
+            version, payload = self.status()
+            for listener in self._status_listeners:
+                listener(version, payload)
+
+    # Public API
+
+    def status(self):
+        """Returns (state version, /api/status payload)"""
+        snapshot = self.state.snapshot()
+        return snapshot.version, build_status_payload(snapshot)
+
+    def status_if_newer(self, version):
+        """Like status(), but returns None when the state has not changed since `version`"""
+        if version is not None and self.state.version <= version:
+            return None
+        return self.status()
+
+    def status_entry_if_newer(self, version):
+        """
+        Like status_if_newer(), with the engine instance id and the time the version was
+        published, so every worker derives the same ETag and Last-Modified for one version
+        """
+        snapshot = self.state.snapshot()
+        if version is not None and snapshot.version <= version:
+            return None
+        return snapshot.version, build_status_payload(snapshot), self.instance_id, snapshot.changed_at
+
+    def simulate_threat(self, threat_type, severity, resolve_after=5):
+        threat, = self._detect_threats([{
+            'type': threat_type,
+            'severity': severity,
+            'description': f'Simulated {threat_type} attack detected',
+            'source': f'192.168.1.{random.randint(1, 255)}',
+            'target': 'web-app-server'
+        }], resolve_after)
+        return threat
+
+    def ingest_threats(self, records, resolve_after=5, analyze_timeout=None):
+        """
+        Records a batch of threats (dicts with type, severity and optionally description,
+        source and target) as one event with one counter update. With `analyze_timeout`,
+        threats are also fed to the Analyzer stage, waiting up to that many seconds in
+        total for queue space; the rest of the batch is not analyzed.
+        """
+        threats = self._detect_threats(records, resolve_after)
+        queued = 0
+        if analyze_timeout is not None:
+            deadline = time.monotonic() + analyze_timeout
+            for threat in threats:
+                anomaly = {key: threat[key] for key in ('id', 'type', 'severity', 'source', 'target', 'description')}
+                if not self.pipeline.submit(anomaly, timeout=max(0.0, deadline - time.monotonic())):
+                    break
+                queued += 1
+        return {
+            'accepted': len(threats),
+            'first_id': threats[0]['id'] if threats else None,
+            'last_id': threats[-1]['id'] if threats else None,
+            'queued_for_analysis': queued
+        }
+
+    def hold_threat(self, threat_id):
+        """Cancels the automatic resolution of a threat; returns the threat, or None if none was pending"""
+        if not self._cancel_resolution(threat_id):
+            return None
+        self._commit_event('threat_held', {'id': threat_id})
+        return self.threat_store.get(threat_id)
+
+    def query_threats(self, **filters):
+        threats, next_cursor = self.threat_store.query(**filters)
+        return {'threats': threats, 'next_cursor': next_cursor, 'retained': len(self.threat_store)}
+
+    def azure_sync(self, service):
+        """
+        Marks an Azure service as synchronized; returns False for unknown services.
+        With connectors configured the service is contacted first, and a failed
+        call raises ConnectorError.
+        """
+        if service not in self.state.get('azure_services'):
+            return False
+        if self.connectors is not None and service in self.connectors:
+            self.connectors.get(service).get('/sync')
+        self._commit_event('azure_sync', {'service': service, 'timestamp': datetime.now().isoformat()})
+        self._notify_status()
+        return True
+
+    def metric_history(self, start, end, metrics=None, resolution=None, max_points=500):
+        """Downsampled mean/min/max series; raises KeyError for unknown metrics or resolutions"""
+        return self.history.query(start, end, metrics=metrics, resolution=resolution, max_points=max_points)
+
+    def simulate_twin(self, events, runs=10000, seed=None):
+        """
+        Predicts response time, error rate and throughput distributions under a what-if
+        scenario, starting from the twin's current state; raises ValueError for a bad scenario
+        """
+        return self.twin_model.simulate(self.state.get('digital_twin'), TwinScenario(events), runs=runs, seed=seed)
+
+    def _detect_threats(self, records, resolve_after):
+        if not records:
+            return []
+        timestamp = datetime.now().isoformat()
+        threats = [
+            {
+                'id': threat_id,
+                'type': str(record.get('type', 'unknown')),
+                'severity': str(record.get('severity', 'low')),
+                'timestamp': timestamp,
+                'description': str(record.get('description') or f"{record.get('type', 'unknown')} threat detected"),
+                'source': str(record.get('source', 'unknown')),
+                'target': str(record.get('target', 'unknown')),
+                'status': 'detected'
+            }
+            for threat_id, record in zip(self.threat_ids.reserve(len(records)), records)
+        ]
+        self._commit_event('threats_detected', {'threats': threats})
+        self._schedule_resolution([threat['id'] for threat in threats], resolve_after)
+        self._notify_status()
+        return threats
+
+    def agent_action(self, agent, action, interval=None):
+        """
+        Starts, pauses or resets one agent and returns its status and counters;
+        `interval` also changes the Watcher cadence. Raises KeyError for an unknown
+        agent and ValueError for an unknown action or a bad interval.
+        """
+        if interval is not None:
+            if agent != 'watcher':
+                raise ValueError('Only the watcher runs on a cadence')
+            self.agents.set_watch_interval(interval)
+        snapshot = self.agents.control(agent, action)
+        if action == 'reset':
+            # Replay restores counters from earlier analysis/remediation records; this marks where they restart
+            self.event_log.append('agent_reset', {'agent': agent, 'timestamp': datetime.now().isoformat()})
+        self._sync_agent_status(agent)
+        self._notify_status()
+        return snapshot
+
+    def agent_counters(self):
+        """Status and live counters of every agent"""
+        return self.agents.snapshots()
+
+    def metrics_text(self):
+        """Histograms, counters and gauges of this process in the Prometheus text format"""
+        return REGISTRY.render()
+
+    def record_request_timings(self, deltas):
+        """Adds request latencies a worker observed since its last call (from HistogramForwarder)"""
+        REQUEST_SECONDS.merge(deltas)
+
+    def profiler_control(self, action, interval=None):
+        """Starts, stops or resets the sampling profiler; returns its status"""
+        if action == 'start':
+            self.profiler.start(interval)
+        elif action == 'stop':
+            self.profiler.stop()
+        elif action == 'reset':
+            self.profiler.reset()
+        else:
+            raise ValueError(f"Unknown profiler action '{action}'")
+        return self.profiler.status()
+
+    def profiler_stacks(self):
+        """Sampled stacks in the folded format flamegraph.pl and speedscope read"""
+        return self.profiler.collapsed()
+
+    def pipeline_stats(self):
+        stats = self.pipeline.stats()
+        if self.connectors is not None:
+            stats['connectors'] = self.connectors.stats()
+        return stats
+
+    def _register_metrics(self):
+        """Gauges and counters read from the engine's components at scrape time"""
+        stages = {'analyzer': self.pipeline.analyzer_stage, 'remediator': self.pipeline.remediator_stage}
+        REGISTRY.callback('aicompliance_pipeline_queue_depth', 'Items waiting in each pipeline stage queue.',
+                          lambda: [((name,), stage.queue.qsize()) for name, stage in stages.items()], ('stage',))
+        REGISTRY.callback('aicompliance_pipeline_items_processed_total', 'Items handled by each pipeline stage.',
+                          lambda: [((name,), stage.stats.processed) for name, stage in stages.items()]
+                          + [(('watcher',), self.pipeline.watcher_stats.processed)], ('stage',), type='counter')
+        REGISTRY.callback('aicompliance_pipeline_errors_total', 'Failed items in each pipeline stage.',
+                          lambda: [((name,), stage.stats.errors) for name, stage in stages.items()]
+                          + [(('watcher',), self.pipeline.watcher_stats.errors)], ('stage',), type='counter')
+        REGISTRY.callback('aicompliance_agent_counter', 'Live agent counters (reset with the agent).',
+                          lambda: [((agent, counter), getattr(self.agents.agents[agent], counter))
+                                   for agent, counters in AGENT_COUNTERS.items() for counter in counters],
+                          ('agent', 'counter'))
+        buffers = {'log_analytics': self.pipeline.watcher.ingestion, 'sentinel': self.pipeline.remediator.incidents}
+        REGISTRY.callback('aicompliance_ingestion_buffered_records', 'Records waiting in upload buffers.',
+                          lambda: [((name,), buffer.stats()['buffered_records']) for name, buffer in buffers.items() if buffer is not None],
+                          ('buffer',))
+        REGISTRY.callback('aicompliance_remediation_in_flight', 'Remediations currently executing.',
+                          lambda: self.pipeline.remediation_executor.stats()['in_flight'])
+        REGISTRY.callback('aicompliance_threats_retained', 'Threats held in the threat store.', lambda: len(self.threat_store))
+        REGISTRY.callback('aicompliance_scheduler_pending_tasks', 'Timers waiting in the engine scheduler.', self.scheduler.pending)
+        REGISTRY.callback('aicompliance_profiler_running', '1 while the sampling profiler is on.', lambda: int(self.profiler.running))
+
+    # Events
+
+    def _apply_event(self, kind, data, replaying=False):
+        """
+        Applies a state-changing event. Used for live requests and for log replay
+        alike, so it must be idempotent for events a snapshot already covers.
+        """
+        with self._events_lock:
+            self._apply_event_locked(kind, data, replaying)
+
+    def _apply_event_locked(self, kind, data, replaying):
+        if kind in ('threat_detected', 'threats_detected'):
+            threats = data['threats'] if kind == 'threats_detected' else [data]
+            threats = [threat for threat in threats if self.threat_store.get(threat['id']) is None]
+            if not threats:
+                return
+            self.threat_store.add_many(threats, [datetime.fromisoformat(threat['timestamp']).timestamp() for threat in threats])
+            with self.state.transaction('threat_level', 'system_metrics', 'agents') as state:
+                state['threat_level'] = threats[-1]['severity']
+                state['system_metrics']['threats_detected'] += len(threats)
+
+                # Update agent statuses; paused or reset agents keep showing it
+                for name, status in (('watcher', 'alert'), ('analyzer', 'processing'), ('remediator', 'active')):
+                    if self.agents.running(name):
+                        state['agents'][name]['status'] = status
+        elif kind in ('threat_resolved', 'threats_resolved'):
+            # A replayed resolution the snapshot already counted must not count again, even
+            # for threats evicted from the store since; records from before sequence numbers
+            # were logged carry none and count as before
+            seq = data.get('seq')
+            counted = replaying and seq is not None and seq <= self._resolution_seq
+            if seq is not None:
+                self._resolution_seq = max(self._resolution_seq, seq)
+            resolved = 0
+            for threat_id in data['ids'] if kind == 'threats_resolved' else [data['id']]:
+                threat = self.threat_store.get(threat_id)
+                if threat is not None:
+                    if threat['status'] == 'blocked':
+                        continue
+                    self.threat_store.update(threat_id, status='blocked')
+                resolved += 1
+            if counted or not resolved:
+                return
+            resolved_at = datetime.fromisoformat(data['timestamp'])
+            with self.state.transaction('threat_level', 'system_metrics', 'agents') as state:
+                state['system_metrics']['threats_blocked'] += resolved
+                state['threat_level'] = 'normal'
+                for name, agent in state['agents'].items():
+                    agent['status'] = self.agents.display_status(name)
+                    agent['last_update'] = resolved_at
+        elif kind == 'threat_held':
+            self.threat_store.update(data['id'], status='investigating')
+        elif kind == 'azure_sync':
+            with self.state.transaction('azure_services') as state:
+                service = state['azure_services'][data['service']]
+                service['last_sync'] = datetime.fromisoformat(data['timestamp'])
+                service['status'] = 'connected'
+
+    def _sync_agent_status(self, *names):
+        """Shows the agents' real status on the dashboard (all agents by default)"""
+        with self.state.transaction('agents') as state:
+            for name in names or self.agents.agents:
+                state['agents'][name]['status'] = self.agents.display_status(name)
+                state['agents'][name]['last_update'] = datetime.now()
+
+    def _commit_event(self, kind, data):
+        """Applies an event and appends it to the durable log, in the order events are applied"""
+        with self._events_lock:
+            self._apply_event(kind, data)
+            self.event_log.append(kind, data)
+
+    def _replay_event(self, kind, data):
+        """Applies a logged event during recovery, restoring agent counters from pipeline results"""
+        if kind == 'analysis':
+            analyzer = self.pipeline.analyzer
+            analyzer.analyses_completed = max(analyzer.analyses_completed, data['analyses_completed'])
+            analyzer.accuracy_rate = data['accuracy_rate']
+        elif kind == 'remediation':
+            remediator = self.pipeline.remediator
+            remediator.actions_executed = max(remediator.actions_executed, data['actions_executed'])
+            remediator.success_rate = data['success_rate']
+        elif kind == 'agent_reset':
+            self.agents.clear_counters(data['agent'])
+        else:
+            self._apply_event(kind, data, replaying=True)
+
+    def _capture_state(self):
+        """Serializable copy of the app state, threat store and agent counters for snapshots"""
+        with self._events_lock:
+            snapshot = self.state.snapshot()
+            threats = self.threat_store.all()
+            resolution_seq = self._resolution_seq
+        return {
+            **build_status_payload(snapshot),
+            'threats': threats,
+            'resolution_seq': resolution_seq,
+            'agent_counters': {
+                'analyses_completed': self.pipeline.analyzer.analyses_completed,
+                'accuracy_rate': self.pipeline.analyzer.accuracy_rate,
+                'actions_executed': self.pipeline.remediator.actions_executed,
+                'success_rate': self.pipeline.remediator.success_rate
+            }
+        }
+
+    def _restore_state(self, state):
+        """Inverse of _capture_state, applied to the freshly started process"""
+        with self.state.transaction('threat_level', 'system_metrics', 'digital_twin', 'agents', 'azure_services') as current:
+            current['threat_level'] = state['threat_level']
+            current['system_metrics'].update(state['system_metrics'])
+            current['digital_twin'].update(state['digital_twin'])
+            for name, agent in state['agents'].items():
+                current['agents'][name] = {**agent, 'last_update': datetime.fromisoformat(agent['last_update'])}
+            for name, service in state['azure_services'].items():
+                current['azure_services'][name] = {**service, 'last_sync': datetime.fromisoformat(service['last_sync'])}
+        for threat in state['threats']:
+            self.threat_store.add(threat, timestamp=datetime.fromisoformat(threat['timestamp']).timestamp())
+        self._resolution_seq = state.get('resolution_seq', 0)
+        counters = state['agent_counters']
+        self.pipeline.analyzer.analyses_completed = counters['analyses_completed']
+        self.pipeline.analyzer.accuracy_rate = counters['accuracy_rate']
+        self.pipeline.remediator.actions_executed = counters['actions_executed']
+        self.pipeline.remediator.success_rate = counters['success_rate']
+
+    def _recover_state(self):
+        """Rebuilds state from the latest snapshot plus the log tail, then resumes pending resolutions"""
+        replayed = self.event_log.recover(self._restore_state, self._replay_event)
+        if replayed or len(self.threat_store):
+            print(f"Recovered {len(self.threat_store)} threats ({replayed} log records replayed)")
+        pending = []
+        for threat in self.threat_store.all():
+            self.threat_ids.observe(threat['id'])
+            if threat['status'] == 'detected':
+                pending.append(threat['id'])
+        if pending:
+            self._schedule_resolution(pending)
+
+    # Timed work
+
+    def _resolve_threats(self, threat_ids):
+        with self._pending_resolutions_lock:
+            # Threats put on hold since scheduling are no longer pending
+            threat_ids = [threat_id for threat_id in threat_ids if self._pending_resolutions.pop(threat_id, None) is not None]
+        if not threat_ids:
+            return
+        with self._events_lock:
+            self._commit_event('threats_resolved', {
+                'ids': threat_ids,
+                'timestamp': datetime.now().isoformat(),
+                'seq': self._resolution_seq + 1
+            })
+        self._notify_status()
+
+    def _schedule_resolution(self, threat_ids, delay=5):
+        """Schedules the automatic resolution of a batch of threats as one timer"""
+        task = self.scheduler.call_later(delay, self._resolve_threats, threat_ids)
+        with self._pending_resolutions_lock:
+            for threat_id in threat_ids:
+                self._pending_resolutions[threat_id] = task
+
+    def _cancel_resolution(self, threat_id):
+        with self._pending_resolutions_lock:
+            task = self._pending_resolutions.pop(threat_id, None)
+        # The timer may be shared with the rest of a batch, so it stays scheduled and skips this threat
+        return task is not None
+
+    def _update_metrics(self):
+        """Periodic task (every 3 seconds) to update system metrics"""
+        with self.state.transaction('system_metrics', 'digital_twin') as state:
+            metrics = state['system_metrics']
+            metrics['cpu_usage'] = max(10, min(90, metrics['cpu_usage'] + random.uniform(-5, 5)))
+            metrics['memory_usage'] = max(20, min(95, metrics['memory_usage'] + random.uniform(-2, 2)))
+            metrics['network_traffic'] = max(100, metrics['network_traffic'] + random.uniform(-100, 100))
+            metrics['active_connections'] = max(100, metrics['active_connections'] + random.randint(-25, 25))
+
+            # Update digital twin metrics
+            twin = state['digital_twin']
+            twin['application_health'] = max(70, min(100, twin['application_health'] + random.uniform(-1, 1)))
+            twin['response_time'] = max(50, min(500, twin['response_time'] + random.uniform(-10, 10)))
+            twin['error_rate'] = max(0, min(5, twin['error_rate'] + random.uniform(-0.01, 0.01)))
+            twin['throughput'] = max(500, twin['throughput'] + random.uniform(-50, 50))
+
+        sample = {name: state[section][name] for section, names in MONITORED_METRICS.items() for name in names}
+        self.history.record(time.time(), sample)
+        self.pipeline.watcher.observe_metrics(sample)
+        self._notify_status()
+        if self.event_log.should_snapshot():
+            self.event_log.write_snapshot(self._capture_state)
+
+
+# Multi-process deployment: one engine process, many request workers
+
+class EngineManager(BaseManager):
+    pass
+
+
+def parse_engine_address(address):
+    """'host:port' selects TCP (e.g. on Windows); anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and os.sep not in address:
+        return (host or '127.0.0.1', int(port))
+    return address
+
+
+def engine_key_path(address):
+    return address + '.key'
+
+
+def engine_authkey(address, create=False):
+    """
+    The secret workers present to the engine. AICOMPLIANCE_ENGINE_AUTHKEY wins and is
+    required for TCP, since the manager protocol unpickles what it receives. For a Unix
+    socket the engine otherwise writes a random key next to it, readable only by its
+    user, and workers read it from there. Raises RuntimeError when no key is available.
+    """
+    configured = os.environ.get('AICOMPLIANCE_ENGINE_AUTHKEY')
+    if configured:
+        return configured.encode('utf-8')
+    if not isinstance(address, str):
+        raise RuntimeError('Set AICOMPLIANCE_ENGINE_AUTHKEY to serve or reach the engine over TCP')
+    path = engine_key_path(address)
+    if create:
+        key = secrets.token_hex(32)
+        if os.path.exists(path):
+            os.remove(path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(key)
+        return key.encode('utf-8')
+    try:
+        with open(path) as f:
+            return f.read().strip().encode('utf-8')
+    except FileNotFoundError:
+        raise RuntimeError(f'No engine key at {path}; start the engine first or set AICOMPLIANCE_ENGINE_AUTHKEY') from None
+
+
+def serve_engine(address):
+    """Runs the engine and serves it to request workers until interrupted"""
+    address = parse_engine_address(address)
+    authkey = engine_authkey(address, create=True) # Before starting anything: refuses TCP without a configured key
+    engine = Engine()
+    engine.start()
+    EngineManager.register('get_engine', callable=lambda: engine, exposed=ENGINE_METHODS)
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address) # Stale socket from a previous run
+    manager = EngineManager(address=address, authkey=authkey)
+    server = manager.get_server()
+    print(f"Engine serving on {address}")
+    try:
+        server.serve_forever()
+    finally:
+        engine.stop()
+
+
+def connect_engine(address):
+    """Returns a proxy to a running engine; each calling thread gets its own connection"""
+    EngineManager.register('get_engine', exposed=ENGINE_METHODS)
+    address = parse_engine_address(address)
+    manager = EngineManager(address=address, authkey=engine_authkey(address))
+    manager.connect()
+    return manager.get_engine()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the shared AICompliance engine for multi-process deployments.')
+    parser.add_argument('--address', default=os.environ.get('AICOMPLIANCE_ENGINE_ADDRESS', '/tmp/aicompliance-engine.sock'),
+                        help='Unix socket path, or host:port for TCP')
+    serve_engine(parser.parse_args().address)
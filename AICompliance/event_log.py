@@ -0,0 +1,271 @@
+# event_log.py
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Record framing: payload length and CRC32 (both big-endian uint32), then the JSON payload
+RECORD_HEADER = struct.Struct(">II")
+SEGMENT_PREFIX = "segment-"
+SNAPSHOT_PREFIX = "snapshot-"
+
+
+class EventLog:
+    """
+    Durable, append-only event log split into fixed-size segment files.
+    Records are length-prefixed JSON with a CRC32 so a torn tail from a crash is
+    detected and truncated on recovery. append() only serializes and enqueues;
+    a background writer group-commits queued records with one fsync per batch,
+    so callers never wait on disk I/O.
+    Periodic snapshots capture the full application state together with the log
+    position they cover; recovery loads the newest snapshot and replays only the
+    records written after it, using memory-mapped reads.
+    """
+
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, fsync_interval=0.05, max_batch=1000,
+                 snapshot_interval=300, snapshot_every_records=10000, keep_snapshots=2):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_every_records = snapshot_every_records
+        self.keep_snapshots = keep_snapshots
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.SimpleQueue()
+        self._condition = threading.Condition()
+        self._appended = 0
+        self._written = 0
+        self._segment_index = 0
+        self._segment_offset = 0
+        self._segment_file = None
+        self._durable_position = (0, 0)
+        self._writer_thread = None
+        self._stopping = False
+        self._records_since_snapshot = 0
+        self._last_snapshot_time = time.time()
+
+    # Writing
+
+    def append(self, kind, data):
+        """Queues an event record; serialization happens here so later mutations of `data` are not captured."""
+        payload = json.dumps({"kind": kind, "ts": time.time(), "data": data}, separators=(",", ":")).encode("utf-8")
+        with self._condition:
+            self._appended += 1
+        self._queue.put(payload)
+
+    def start(self):
+        """
+        Starts the writer thread on a fresh segment. Never appending to a segment
+        from a previous run keeps snapshot positions exact after a crash.
+        """
+        if self._writer_thread is not None:
+            return
+        segments = self._segment_indices()
+        self._open_segment(segments[-1] + 1 if segments else 0)
+        self._durable_position = (self._segment_index, self._segment_offset)
+        self._stopping = False
+        self._writer_thread = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+        self._writer_thread.start()
+
+    def flush(self, timeout=5.0):
+        """Blocks until every record appended so far is written and fsynced."""
+        with self._condition:
+            target = self._appended
+            return self._condition.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout=5.0):
+        if self._writer_thread is None:
+            return
+        self.flush(timeout)
+        self._stopping = True
+        self._queue.put(None)
+        self._writer_thread.join(timeout)
+        self._writer_thread = None
+        self._segment_file.close()
+        self._segment_file = None
+
+    def _write_loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.fsync_interval
+            # Group commit: gather whatever arrives within the fsync window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write_batch(batch)
+            except OSError:
+                logger.exception("Event log write failed; %d records lost", len(batch))
+            with self._condition:
+                self._written += len(batch)
+                self._records_since_snapshot += len(batch)
+                self._durable_position = (self._segment_index, self._segment_offset)
+                self._condition.notify_all()
+            if self._stopping:
+                return
+
+    def _write_batch(self, batch):
+        for payload in batch:
+            if self._segment_offset >= self.segment_bytes:
+                self._sync_segment()
+                self._segment_file.close()
+                self._open_segment(self._segment_index + 1)
+            record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+            self._segment_file.write(record)
+            self._segment_offset += len(record)
+        self._sync_segment()
+
+    def _sync_segment(self):
+        self._segment_file.flush()
+        os.fsync(self._segment_file.fileno())
+
+    def _open_segment(self, index):
+        path = self._segment_path(index)
+        self._segment_file = open(path, "ab")
+        self._segment_index = index
+        self._segment_offset = self._segment_file.tell()
+
+    # Snapshots
+
+    def should_snapshot(self):
+        """True once enough records or time have accumulated since the last snapshot."""
+        if self._records_since_snapshot == 0:
+            return False
+        return (self._records_since_snapshot >= self.snapshot_every_records
+                or time.time() - self._last_snapshot_time >= self.snapshot_interval)
+
+    def write_snapshot(self, capture_state):
+        """
+        Writes a snapshot of `capture_state()`. The log position is taken before the
+        state is captured, so the snapshot covers every record up to that position;
+        records after it may already be reflected and must replay idempotently.
+        """
+        self.flush()
+        with self._condition:
+            position = self._durable_position
+            self._records_since_snapshot = 0
+        self._last_snapshot_time = time.time()
+        state = capture_state()
+
+        path = self._snapshot_path(*position)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"position": list(position), "created": time.time(), "state": state}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        self._prune(position)
+        return path
+
+    def _prune(self, position):
+        """Drops old snapshots and segments no retained snapshot needs for replay."""
+        snapshots = self._snapshot_names()
+        for name in snapshots[:-self.keep_snapshots]:
+            os.remove(os.path.join(self.directory, name))
+        oldest_segment = self._parse_snapshot_name(snapshots[-self.keep_snapshots:][0])[0] if snapshots else position[0]
+        for index in self._segment_indices():
+            if index < oldest_segment:
+                os.remove(self._segment_path(index))
+
+    # Recovery
+
+    def recover(self, restore_snapshot, apply_record):
+        """
+        Rebuilds state: passes the newest snapshot's state to `restore_snapshot`, then
+        calls `apply_record(kind, data)` for every record logged after it. A torn or
+        corrupt tail in the last segment is truncated. Must run before start().
+        Returns the number of records replayed.
+        """
+        position = (0, 0)
+        snapshots = self._snapshot_names()
+        for name in reversed(snapshots):
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable snapshot %s", name)
+                continue
+            restore_snapshot(snapshot["state"])
+            position = tuple(snapshot["position"])
+            break
+
+        replayed = 0
+        segments = [index for index in self._segment_indices() if index >= position[0]]
+        for index in segments:
+            start = position[1] if index == position[0] else 0
+            count, valid_end = self._replay_segment(index, start, apply_record)
+            replayed += count
+            path = self._segment_path(index)
+            if valid_end < os.path.getsize(path):
+                logger.warning("Truncating corrupt tail of %s at offset %d", path, valid_end)
+                with open(path, "r+b") as f:
+                    f.truncate(valid_end)
+                # Anything after a corrupt record cannot be trusted
+                for later in segments[segments.index(index) + 1:]:
+                    os.remove(self._segment_path(later))
+                break
+        return replayed
+
+    def _replay_segment(self, index, offset, apply_record):
+        path = self._segment_path(index)
+        size = os.path.getsize(path)
+        if size <= offset:
+            return 0, size
+        count = 0
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while offset + RECORD_HEADER.size <= size:
+                length, crc = RECORD_HEADER.unpack_from(mm, offset)
+                start = offset + RECORD_HEADER.size
+                end = start + length
+                if end > size:
+                    break
+                payload = mm[start:end]
+                if zlib.crc32(payload) != crc:
+                    break
+                record = json.loads(payload)
+                apply_record(record["kind"], record["data"])
+                count += 1
+                offset = end
+        return count, offset
+
+    # Paths
+
+    def _segment_path(self, index):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{index:08d}.log")
+
+    def _snapshot_path(self, segment_index, offset):
+        return os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{segment_index:08d}-{offset:012d}.json")
+
+    def _segment_indices(self):
+        return sorted(int(name[len(SEGMENT_PREFIX):-len(".log")]) for name in os.listdir(self.directory)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(".log"))
+
+    def _snapshot_names(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith(SNAPSHOT_PREFIX) and name.endswith(".json"))
+
+    @staticmethod
+    def _parse_snapshot_name(name):
+        segment, offset = name[len(SNAPSHOT_PREFIX):-len(".json")].split("-")
+        return int(segment), int(offset)
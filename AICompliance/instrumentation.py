@@ -0,0 +1,398 @@
+# instrumentation.py
+import bisect
+import functools
+import math
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+
+# Latency buckets in seconds, from 100us (agent methods) to 10s (slow requests)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _ShardOwner:
+    """Lives in one thread's thread-local storage; collected when that thread exits."""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+class _HistogramChild:
+    """
+    One label combination. Each thread counts into its own shard, so observe() takes
+    no lock on the hot path; snapshot() adds the shards up at scrape time. When a
+    thread exits, its shard is folded into `_retired` and dropped, so servers that
+    start a thread per request keep one shard per live thread, not one per request.
+    """
+
+    __slots__ = ("_bounds", "_local", "_shards", "_retired", "_lock")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = [0] * (len(bounds) + 1) + [0.0] # Buckets, +Inf, then the sum
+        # Reentrant: a thread's shard may be retired by garbage collection while this thread holds the lock
+        self._lock = threading.RLock()
+
+    def observe(self, value):
+        try:
+            shard = self._local.owner.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect.bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def _new_shard(self):
+        shard = [0] * len(self._retired)
+        owner = self._local.owner = _ShardOwner(shard)
+        key = id(shard)
+        with self._lock:
+            self._shards[key] = shard
+        weakref.finalize(owner, self._retire, key)
+        return shard
+
+    def _retire(self, key):
+        with self._lock:
+            shard = self._shards.pop(key, None)
+            if shard is not None:
+                self._retired = [a + b for a, b in zip(self._retired, shard)]
+
+    def add(self, counts, total):
+        """Adds bucket counts (without the cumulative sum) observed elsewhere, e.g. in another process."""
+        with self._lock:
+            self._retired = [a + b for a, b in zip(self._retired, list(counts) + [total])]
+
+    def snapshot(self):
+        with self._lock:
+            shards = [self._retired] + list(self._shards.values())
+        counts = [0] * (len(self._bounds) + 1)
+        total = 0.0
+        for shard in shards:
+            for i, count in enumerate(shard[:-1]):
+                counts[i] += count
+            total += shard[-1]
+        return counts, total
+
+
+class Histogram:
+    """A labelled latency histogram with fixed buckets, exposed with cumulative counts."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, _HistogramChild(self.bounds))
+        return child
+
+    def observe(self, value, *labelvalues):
+        self.labels(*labelvalues).observe(value)
+
+    def export(self):
+        """{label values: (bucket counts, sum)} of everything observed so far."""
+        return {values: child.snapshot() for values, child in list(self._children.items())}
+
+    def merge(self, deltas):
+        """Adds (label values, bucket counts, sum) triples from HistogramForwarder.forward()."""
+        for values, counts, total in deltas:
+            self.labels(*values).add(counts, total)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", values, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", values, "", total
+            yield "_count", values, "", cumulative
+
+
+class HistogramForwarder:
+    """
+    Sends a histogram's new observations to another process's copy of it, so a
+    single registry reports the total across processes. Only what was observed
+    since the last successful forward() is sent.
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self._sent = {}
+        self._lock = threading.Lock()
+
+    def forward(self, send):
+        """Calls send(deltas) with the new observations, if any; nothing is marked sent if it raises."""
+        with self._lock:
+            exported = self.histogram.export()
+            deltas = []
+            for values, (counts, total) in exported.items():
+                sent_counts, sent_total = self._sent.get(values, ((0,) * len(counts), 0.0))
+                delta = [count - sent for count, sent in zip(counts, sent_counts)]
+                if any(delta):
+                    deltas.append((values, delta, total - sent_total))
+            if deltas:
+                send(deltas)
+                self._sent = exported
+
+
+class CounterMetric:
+    """A labelled, monotonically increasing counter."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in values:
+            yield "", labelvalues, "", value
+
+
+class CallbackMetric:
+    """
+    A gauge or counter read at scrape time from `collect()`, which returns either a
+    number or an iterable of (label values, number) pairs.
+    """
+
+    def __init__(self, name, documentation, collect, labelnames=(), type="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+        self.type = type
+
+    def samples(self):
+        collected = self.collect()
+        if isinstance(collected, (int, float)):
+            collected = [((), collected)]
+        for labelvalues, value in collected:
+            yield "", labelvalues, "", value
+
+
+class MetricsRegistry:
+    """
+    Named metric families rendered in the Prometheus text exposition format.
+    Histograms and counters are created once per name and shared by every caller;
+    registering a callback metric again replaces its collector, so a restarted
+    engine reports its own components.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(name, lambda: Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(name, lambda: CounterMetric(name, documentation, labelnames))
+
+    def callback(self, name, documentation, collect, labelnames=(), type="gauge"):
+        metric = CallbackMetric(name, documentation, collect, labelnames, type)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def _get_or_create(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def render(self):
+        """All metrics in the text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as exc: # A failing collector must not break the whole scrape
+                lines.append(f"# {metric.name} collection failed: {exc!r}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labelvalues, extra, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(metric.labelnames, labelvalues, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; the engine and the Flask app both report into it
+REGISTRY = MetricsRegistry()
+
+AGENT_METHOD_SECONDS = REGISTRY.histogram(
+    "aicompliance_agent_method_duration_seconds", "Time spent in agent methods.", ("agent", "method"))
+AGENT_METHOD_ERRORS = REGISTRY.counter(
+    "aicompliance_agent_method_errors_total", "Exceptions raised by agent methods.", ("agent", "method"))
+
+# Latency of every request, by route rule rather than raw path so ids do not multiply the series.
+# Request workers forward theirs to the engine process, which reports the total.
+REQUEST_SECONDS = REGISTRY.histogram(
+    "aicompliance_http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "endpoint", "status"))
+
+
+def timed(histogram, *labelvalues, errors=None):
+    """Decorator recording each call's duration in `histogram`, and exceptions in `errors`."""
+    child = histogram.labels(*labelvalues)
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(*labelvalues)
+                raise
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def instrument_agent(agent, kind, methods):
+    """
+    Replaces the given methods on one agent instance with timed wrappers. Callers
+    that bound a method before this call keep the unwrapped one, so instrument
+    agents before handing their methods to the pipeline.
+    """
+    for method in methods:
+        setattr(agent, method, timed(AGENT_METHOD_SECONDS, kind, method, errors=AGENT_METHOD_ERRORS)(getattr(agent, method)))
+    return agent
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler. While running, a background thread snapshots every
+    other thread's Python stack each `interval` seconds via sys._current_frames() and
+    counts identical stacks; collapsed() returns them in the folded format that
+    flamegraph.pl and speedscope read ("thread;outer;...;inner count"). When stopped
+    it has no thread and no hooks, so it costs nothing.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = Counter()
+        self._samples = 0
+        self._started_at = None
+        self._lock = threading.Lock()
+        # Serializes start() and stop(); held while joining, so never taken by the sampling thread
+        self._control_lock = threading.Lock()
+        self._stop_event = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None):
+        with self._control_lock:
+            if interval is not None:
+                if interval <= 0:
+                    raise ValueError("interval must be positive")
+                self.interval = interval
+            if self._thread is not None:
+                return
+            # Each run gets its own event, so stopping one run can never stop the next
+            stop_event = threading.Event()
+            thread = threading.Thread(target=self._run, args=(stop_event,), name="sampling-profiler", daemon=True)
+            with self._lock:
+                self._started_at = time.time()
+                self._stop_event, self._thread = stop_event, thread
+            thread.start()
+
+    def stop(self):
+        with self._control_lock:
+            if self._thread is None:
+                return
+            self._stop_event.set()
+            self._thread.join()
+            with self._lock:
+                self._stop_event = self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+
+    def status(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "interval_seconds": self.interval,
+                "samples": self._samples,
+                "distinct_stacks": len(self._stacks),
+                "started_at": self._started_at,
+            }
+
+    def collapsed(self):
+        """Folded stacks, most frequent first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self, stop_event):
+        own_id = threading.get_ident()
+        while not stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None and len(frames) < self.max_depth:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                stacks.append(";".join(reversed(frames)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self._samples += 1
@@ -0,0 +1,212 @@
+# metrics_history.py
+import threading
+
+import numpy as np
+
+# (name, resolution in seconds, retention in seconds); raw keeps every sample
+DEFAULT_TIERS = (
+    ('raw', 0, 6 * 3600),
+    ('1m', 60, 7 * 86400),
+    ('1h', 3600, 90 * 86400),
+)
+
+
+class _Tier:
+    """
+    Fixed-capacity ring of time buckets stored column-wise: one timestamp column,
+    a sample count column, and mean/min/max matrices with one column per metric.
+    """
+
+    def __init__(self, name, resolution, retention, metric_count, raw_interval):
+        self.name = name
+        self.resolution = resolution
+        self.retention = retention
+        self.capacity = int(retention / (resolution or raw_interval)) + 1
+        self.timestamps = np.zeros(self.capacity)
+        self.counts = np.zeros(self.capacity, dtype=np.int64)
+        self.means = np.zeros((self.capacity, metric_count))
+        self.mins = np.zeros((self.capacity, metric_count))
+        self.maxs = np.zeros((self.capacity, metric_count))
+        self.size = 0
+        self._next = 0
+
+    def append(self, timestamp, count, means, mins, maxs):
+        slot = self._next
+        self.timestamps[slot] = timestamp
+        self.counts[slot] = count
+        self.means[slot] = means
+        self.mins[slot] = mins
+        self.maxs[slot] = maxs
+        self._next = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def oldest(self):
+        if self.size == 0:
+            return None
+        return self.timestamps[(self._next - self.size) % self.capacity]
+
+    def window(self, start, end, columns):
+        """Copies the buckets with start <= timestamp <= end, oldest first, for the given metric columns."""
+        order = (np.arange(self.size) + (self._next - self.size)) % self.capacity
+        timestamps = self.timestamps[order]
+        low = np.searchsorted(timestamps, start, side='left')
+        high = np.searchsorted(timestamps, end, side='right')
+        rows = order[low:high]
+        return (timestamps[low:high], self.counts[rows],
+                self.means[np.ix_(rows, columns)], self.mins[np.ix_(rows, columns)], self.maxs[np.ix_(rows, columns)])
+
+
+class _Rollup:
+    """Accumulates samples (or finer buckets) into the currently open bucket of a coarser tier."""
+
+    def __init__(self, tier, metric_count):
+        self.tier = tier
+        self.bucket = None
+        self.count = 0
+        self.sums = np.zeros(metric_count)
+        self.mins = np.full(metric_count, np.inf)
+        self.maxs = np.full(metric_count, -np.inf)
+
+    def add(self, timestamp, count, means, mins, maxs):
+        """Adds to the open bucket; returns the closed bucket if `timestamp` starts a new one."""
+        bucket = timestamp - timestamp % self.tier.resolution
+        closed = None
+        if self.bucket is not None and bucket != self.bucket:
+            closed = self.close()
+        self.bucket = bucket
+        self.count += count
+        self.sums += means * count
+        np.minimum(self.mins, mins, out=self.mins)
+        np.maximum(self.maxs, maxs, out=self.maxs)
+        return closed
+
+    def close(self):
+        if self.bucket is None or self.count == 0:
+            return None
+        closed = (self.bucket, self.count, self.sums / self.count, self.mins.copy(), self.maxs.copy())
+        self.tier.append(*closed)
+        self.count = 0
+        self.sums[:] = 0.0
+        self.mins[:] = np.inf
+        self.maxs[:] = -np.inf
+        return closed
+
+
+class MetricsHistory:
+    """
+    In-memory time-series store for a fixed set of numeric metrics.
+    Samples land in the raw tier and roll up into 1-minute and 1-hour buckets
+    (mean/min/max per metric), each tier a preallocated ring sized by its
+    retention, so memory is bounded however long the process runs. Queries pick
+    the finest tier that still covers the requested window and downsample it
+    to the requested resolution.
+    """
+
+    def __init__(self, metrics, raw_interval=3, tiers=DEFAULT_TIERS):
+        self.metrics = tuple(metrics)
+        self._columns = {name: i for i, name in enumerate(self.metrics)}
+        self._tiers = [_Tier(name, resolution, retention, len(self.metrics), raw_interval)
+                       for name, resolution, retention in tiers]
+        self._rollups = [_Rollup(tier, len(self.metrics)) for tier in self._tiers[1:]]
+        self._lock = threading.Lock()
+
+    @property
+    def resolutions(self):
+        return {tier.name: tier.resolution for tier in self._tiers}
+
+    def record(self, timestamp, values):
+        """Appends one sample; `values` maps every metric name to its value."""
+        row = np.array([values[name] for name in self.metrics], dtype=np.float64)
+        with self._lock:
+            self._tiers[0].append(timestamp, 1, row, row, row)
+            bucket = (timestamp, 1, row, row, row)
+            for rollup in self._rollups:
+                # A bucket closed in a finer tier feeds the next tier up
+                bucket = rollup.add(*bucket)
+                if bucket is None:
+                    break
+
+    def query(self, start, end, metrics=None, resolution=None, max_points=500):
+        """
+        Returns mean/min/max series for `metrics` between `start` and `end` (epoch seconds).
+        `resolution` is a tier name ('raw', '1m', '1h') or a bucket size in seconds; by default
+        it is chosen so the result has at most `max_points` points. A finer explicit resolution
+        is coarsened to that limit too.
+        """
+        metrics = list(metrics or self.metrics)
+        unknown = [name for name in metrics if name not in self._columns]
+        if unknown:
+            raise KeyError(f"Unknown metrics: {', '.join(unknown)}")
+        if isinstance(resolution, str):
+            resolution = self.resolutions[resolution]
+        # Buckets are aligned to multiples of the step, so the window can touch one more than span / step
+        step = (end - start) / max(1, max_points - 1)
+        if resolution is not None:
+            step = max(step, resolution)
+        columns = [self._columns[name] for name in metrics]
+
+        with self._lock:
+            tier = self._pick_tier(start, step if resolution is None else resolution)
+            timestamps, counts, means, mins, maxs = tier.window(start, end, columns)
+            # An open rollup bucket holds the newest data of a coarse tier; include it
+            rollup = next((r for r in self._rollups if r.tier is tier), None)
+            if rollup is not None and rollup.count and start <= rollup.bucket <= end:
+                timestamps = np.append(timestamps, rollup.bucket)
+                counts = np.append(counts, rollup.count)
+                means = np.vstack((means, rollup.sums[columns] / rollup.count))
+                mins = np.vstack((mins, rollup.mins[columns]))
+                maxs = np.vstack((maxs, rollup.maxs[columns]))
+
+        if step > (tier.resolution or 0) and len(timestamps):
+            timestamps, counts, means, mins, maxs = self._downsample(timestamps, counts, means, mins, maxs, step)
+
+        return {
+            'start': start,
+            'end': end,
+            'tier': tier.name,
+            'resolution': max(step, tier.resolution),
+            'timestamps': timestamps.tolist(),
+            'series': {
+                name: {
+                    'mean': np.round(means[:, i], 3).tolist(),
+                    'min': np.round(mins[:, i], 3).tolist(),
+                    'max': np.round(maxs[:, i], 3).tolist(),
+                }
+                for i, name in enumerate(metrics)
+            },
+        }
+
+    def _pick_tier(self, start, step):
+        """
+        The coarsest tier no coarser than `step`, or a coarser one if that is needed
+        to reach back to `start`; failing that, the tier with the oldest data. If those
+        are all still empty (e.g. before the first minute closes), the coarsest finer
+        tier that has data.
+        """
+        candidates = [tier for tier in self._tiers if tier.resolution <= step] or self._tiers[:1]
+        chosen = candidates[-1]
+        index = self._tiers.index(chosen)
+        best = None
+        for tier in self._tiers[index:]:
+            oldest = tier.oldest()
+            if oldest is None:
+                continue
+            if oldest <= start:
+                return tier
+            if best is None or oldest < best.oldest():
+                best = tier
+        return best or next((tier for tier in reversed(self._tiers[:index]) if tier.size), chosen)
+
+    @staticmethod
+    def _downsample(timestamps, counts, means, mins, maxs, step):
+        buckets = np.floor(timestamps / step) * step
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        weights = counts[:, None]
+        bucket_counts = np.add.reduceat(counts, starts)
+        return (
+            buckets[starts],
+            bucket_counts,
+            np.add.reduceat(means * weights, starts, axis=0) / bucket_counts[:, None],
+            np.minimum.reduceat(mins, starts, axis=0),
+            np.maximum.reduceat(maxs, starts, axis=0),
+        )
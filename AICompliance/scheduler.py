@@ -0,0 +1,111 @@
+# scheduler.py
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTask:
+    """Handle for a delayed or periodic call; cancel() prevents any further runs."""
+
+    __slots__ = ("deadline", "fn", "args", "kwargs", "interval", "cancelled")
+
+    def __init__(self, deadline, fn, args, kwargs, interval=None):
+        self.deadline = deadline
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TaskScheduler:
+    """
+    Runs delayed and periodic callbacks from one thread ordered by a min-heap of
+    deadlines, so thousands of pending timers cost heap entries rather than
+    sleeping OS threads. Callbacks run on the scheduler thread and should be
+    short; cancelled tasks are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, name="scheduler"):
+        self.name = name
+        self._heap = []
+        self._sequence = itertools.count() # Tie-breaker keeping equal deadlines in FIFO order
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def call_later(self, delay, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) once after `delay` seconds."""
+        return self._push(ScheduledTask(time.monotonic() + max(0.0, delay), fn, args, kwargs))
+
+    def call_every(self, interval, fn, *args, initial_delay=None, **kwargs):
+        """Runs fn every `interval` seconds (fixed rate) until the task is cancelled."""
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        delay = interval if initial_delay is None else initial_delay
+        return self._push(ScheduledTask(time.monotonic() + delay, fn, args, kwargs, interval))
+
+    def pending(self):
+        """Number of scheduled tasks that have not been cancelled."""
+        with self._condition:
+            return sum(1 for _, _, task in self._heap if not task.cancelled)
+
+    def _push(self, task):
+        with self._condition:
+            heapq.heappush(self._heap, (task.deadline, next(self._sequence), task))
+            # Only wake the thread if this task became the earliest deadline
+            if self._heap[0][2] is task:
+                self._condition.notify()
+        return task
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    deadline, _, task = self._heap[0]
+                    if task.cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+                    wait = deadline - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._condition.wait(wait)
+                else:
+                    return
+
+            try:
+                task.fn(*task.args, **task.kwargs)
+            except Exception:
+                logger.exception("Scheduled task %r failed", getattr(task.fn, "__name__", task.fn))
+
+            if task.interval is not None and not task.cancelled:
+                # Fixed rate, but never try to catch up on missed runs in a burst
+                task.deadline = max(task.deadline + task.interval, time.monotonic())
+                self._push(task)
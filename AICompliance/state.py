@@ -0,0 +1,92 @@
+# state.py
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _copy(value):
+    """Copies nested dicts so a transaction never mutates a published section."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    return value
+
+
+class StateSnapshot:
+    """An immutable, versioned view of every state section at one point in time."""
+
+    __slots__ = ("version", "sections", "changed_at")
+
+    def __init__(self, version, sections):
+        self.version = version
+        self.sections = sections
+        self.changed_at = time.time() # When this version was published (epoch seconds)
+
+    def __getitem__(self, section):
+        return self.sections[section]
+
+    def __contains__(self, section):
+        return section in self.sections
+
+
+class AppState:
+    """
+    Thread-safe, copy-on-write container for the dashboard state.
+    Each top-level section (threat_level, agents, system_metrics, ...) has its
+    own lock, so writers only contend when they touch the same section.
+    A transaction edits private copies of its sections and publishes them together
+    as a new StateSnapshot, so readers take a consistent view by grabbing a
+    single reference, without locking and without ever blocking writers.
+    Published section dicts are shared between snapshots and must never be
+    mutated in place; go through transaction() or increment() instead.
+    """
+
+    def __init__(self, initial):
+        self._section_names = tuple(initial)
+        self._section_locks = {name: threading.Lock() for name in self._section_names}
+        self._publish_lock = threading.Lock()
+        self._snapshot = StateSnapshot(0, {name: _copy(value) for name, value in initial.items()})
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def snapshot(self):
+        """Returns the current StateSnapshot; lock-free."""
+        return self._snapshot
+
+    def get(self, section):
+        return self._snapshot.sections[section]
+
+    @contextmanager
+    def transaction(self, *sections):
+        """
+        Yields a dict of working copies of `sections`; on a clean exit the copies
+        (including reassigned scalar sections) are published atomically as one new version.
+        """
+        unknown = set(sections) - set(self._section_names)
+        if unknown:
+            raise KeyError(f"Unknown state sections: {sorted(unknown)}")
+        # Acquire in declaration order so overlapping transactions cannot deadlock
+        ordered = [name for name in self._section_names if name in sections]
+        for name in ordered:
+            self._section_locks[name].acquire()
+        try:
+            current = self._snapshot.sections
+            working = {name: _copy(current[name]) for name in ordered}
+            yield working
+            self._publish({name: working[name] for name in ordered})
+        finally:
+            for name in reversed(ordered):
+                self._section_locks[name].release()
+
+    def increment(self, section, field, amount=1):
+        """Atomically adds `amount` to a numeric field and returns the new value."""
+        with self.transaction(section) as state:
+            state[section][field] += amount
+            return state[section][field]
+
+    def _publish(self, changes):
+        with self._publish_lock:
+            sections = dict(self._snapshot.sections)
+            sections.update(changes)
+            self._snapshot = StateSnapshot(self._snapshot.version + 1, sections)
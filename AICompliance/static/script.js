@@ -1,7 +1,14 @@
 // Global variables
 var currentData = {};
 var updateInterval;
+var statusStream = null;
+var streamRetryDelay = 5000; // Doubles up to a minute while the stream stays unavailable
+var streamRetryAt = 0;
 var dummyLogs = [];
+var threatLogs = [];
+var threatLogsCursor = null;
+var historyInterval;
+var agentsInterval;
 
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function() {
@@ -9,6 +16,11 @@ document.addEventListener('DOMContentLoaded', function() {
     startRealTimeUpdates();
     generateDummyLogs();
     updateLogsGrid();
+    loadThreatLogs(false);
+    loadPerformanceHistory();
+    historyInterval = setInterval(loadPerformanceHistory, 60000);
+    loadAgentCounters();
+    agentsInterval = setInterval(loadAgentCounters, 5000);
 });
 
 // Generate dummy threat logs
@@ -43,6 +55,57 @@ function generateDummyLogs() {
     });
 }
 
+// Load a page of threat history from /api/threats (newest first)
+function loadThreatLogs(append) {
+    var url = '/api/threats?limit=50';
+    if (append && threatLogsCursor !== null) {
+        url += '&cursor=' + threatLogsCursor;
+    }
+    
+    fetch(url)
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(data) {
+            var logs = data.threats.map(function(threat) {
+                return {
+                    id: threat.id,
+                    timestamp: new Date(threat.timestamp),
+                    type: threat.type,
+                    severity: threat.severity,
+                    source: threat.source,
+                    target: threat.target,
+                    description: threat.description,
+                    status: threat.status
+                };
+            });
+            threatLogs = append ? threatLogs.concat(logs) : logs;
+            threatLogsCursor = data.next_cursor;
+            updateLogsGrid();
+        })
+        .catch(function(error) {
+            console.error('Error fetching threat logs:', error);
+        });
+}
+
+// Severity values allowed as CSS classes; anything else renders as 'unknown'
+var SEVERITIES = ['low', 'medium', 'high', 'critical'];
+
+function severityClass(severity) {
+    var value = String(severity || '').toLowerCase();
+    return SEVERITIES.indexOf(value) !== -1 ? value : 'unknown';
+}
+
+// Creates an element whose text is set as text, never parsed as HTML
+function createTextElement(tag, className, text) {
+    var element = document.createElement(tag);
+    if (className) {
+        element.className = className;
+    }
+    element.textContent = text === undefined || text === null ? '' : String(text);
+    return element;
+}
+
 // Update logs grid
 function updateLogsGrid() {
     var logsGrid = document.getElementById('threat-logs-grid');
@@ -50,27 +113,47 @@ function updateLogsGrid() {
     
     logsGrid.innerHTML = '';
     
-    for (var i = 0; i < dummyLogs.length; i++) {
-        var log = dummyLogs[i];
+    // Fall back to demo data until real threats have been recorded
+    var logs = threatLogs.length ? threatLogs : dummyLogs;
+    
+    for (var i = 0; i < logs.length; i++) {
+        var log = logs[i];
         var logCard = document.createElement('div');
         logCard.className = 'log-card';
         
-        logCard.innerHTML = 
-            '<div class="log-header">' +
-                '<span class="log-severity ' + log.severity + '">' + log.severity.toUpperCase() + '</span>' +
-                '<span class="log-time">' + log.timestamp.toLocaleString() + '</span>' +
-            '</div>' +
-            '<div class="log-content">' +
-                '<strong>' + log.type + '</strong><br>' +
-                log.description +
-            '</div>' +
-            '<div class="log-details">' +
-                'Source: ' + log.source + ' → Target: ' + log.target + '<br>' +
-                'Status: ' + log.status.charAt(0).toUpperCase() + log.status.slice(1) +
-            '</div>';
+        // Threat fields come from API clients, so they are only ever set as text
+        var severity = severityClass(log.severity);
+        var status = String(log.status || '');
+        
+        var header = createTextElement('div', 'log-header');
+        header.appendChild(createTextElement('span', 'log-severity ' + severity, severity.toUpperCase()));
+        header.appendChild(createTextElement('span', 'log-time', log.timestamp.toLocaleString()));
+        
+        var content = createTextElement('div', 'log-content');
+        content.appendChild(createTextElement('strong', null, log.type));
+        content.appendChild(document.createElement('br'));
+        content.appendChild(document.createTextNode(String(log.description || '')));
+        
+        var details = createTextElement('div', 'log-details', 'Source: ' + log.source + ' → Target: ' + log.target);
+        details.appendChild(document.createElement('br'));
+        details.appendChild(document.createTextNode('Status: ' + status.charAt(0).toUpperCase() + status.slice(1)));
+        
+        logCard.appendChild(header);
+        logCard.appendChild(content);
+        logCard.appendChild(details);
         
         logsGrid.appendChild(logCard);
     }
+    
+    if (threatLogs.length && threatLogsCursor !== null) {
+        var loadMore = document.createElement('button');
+        loadMore.className = 'connection-btn';
+        loadMore.textContent = 'Load older threats';
+        loadMore.addEventListener('click', function() {
+            loadThreatLogs(true);
+        });
+        logsGrid.appendChild(loadMore);
+    }
 }
 
 // Show threat sub-tab
@@ -99,7 +182,7 @@ function showThreatTab(tabName) {
     
     // Update logs grid if logs tab is selected
     if (tabName === 'logs') {
-        updateLogsGrid();
+        loadThreatLogs(false);
     }
 }
 
@@ -196,33 +279,96 @@ function controlAgent(agentName, action) {
         }
     };
     
-    // Update status
-    var statusText = action === 'start' ? 'Active' : 
-                    action === 'pause' ? 'Paused' : 'Resetting';
-    statusElement.textContent = statusText;
-    
-    // Update activity log
-    var activityLog = activityElement.querySelector('.activity-log');
-    activityLog.innerHTML = '';
-    
-    var agentActivities = activities[agentName][action];
-    for (var i = 0; i < agentActivities.length; i++) {
-        var p = document.createElement('p');
-        p.textContent = agentActivities[i];
-        activityLog.appendChild(p);
-    }
-    
-    showNotification(agentName.charAt(0).toUpperCase() + agentName.slice(1) + ' agent ' + action + ' command executed');
-    
-    // Reset status after reset action
-    if (action === 'reset') {
-        setTimeout(function() {
-            statusElement.textContent = 'Active';
-            controlAgent(agentName, 'start');
-        }, 3000);
+    fetch('/api/agent_action', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            agent: agentName,
+            action: action
+        })
+    })
+    .then(function(response) {
+        return response.json();
+    })
+    .then(function(data) {
+        if (data.status !== 'success') {
+            showNotification('Agent command failed: ' + data.message);
+            return;
+        }
+        
+        // Update status
+        statusElement.textContent = action === 'reset' ? 'Resetting' : formatAgentStatus(data.agent);
+        updateAgentCounters(agentName, data.agent);
+        
+        // Update activity log
+        var activityLog = activityElement.querySelector('.activity-log');
+        activityLog.innerHTML = '';
+        
+        var agentActivities = activities[agentName][action];
+        for (var i = 0; i < agentActivities.length; i++) {
+            var p = document.createElement('p');
+            p.textContent = agentActivities[i];
+            activityLog.appendChild(p);
+        }
+        
+        showNotification(agentName.charAt(0).toUpperCase() + agentName.slice(1) + ' agent ' + action + ' command executed');
+        
+        // Restart the agent after a reset
+        if (action === 'reset') {
+            setTimeout(function() {
+                controlAgent(agentName, 'start');
+            }, 3000);
+        }
+    })
+    .catch(function(error) {
+        console.error('Error controlling agent:', error);
+        showNotification('Agent command failed');
+    });
+}
+
+// Agent status as shown on the control cards
+function formatAgentStatus(agent) {
+    return agent.status.charAt(0).toUpperCase() + agent.status.slice(1);
+}
+
+// Fill an agent card's counters from /api/agents or /api/agent_action data
+function updateAgentCounters(agentName, agent) {
+    var counters = {
+        watcher: {'watcher-events': agent.events_processed, 'watcher-anomalies': agent.anomalies_detected},
+        analyzer: {'analyzer-analyses': agent.analyses_completed, 'analyzer-accuracy': agent.accuracy_rate + '%'},
+        remediator: {'remediator-actions': agent.actions_executed, 'remediator-success': agent.success_rate + '%'}
+    };
+    var elements = counters[agentName];
+    for (var id in elements) {
+        var element = document.getElementById(id);
+        if (element) {
+            element.textContent = typeof elements[id] === 'number' ? elements[id].toLocaleString() : elements[id];
+        }
     }
 }
 
+// Load live agent counters and statuses
+function loadAgentCounters() {
+    fetch('/api/agents')
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(agents) {
+            for (var agentName in agents) {
+                updateAgentCounters(agentName, agents[agentName]);
+                var statusElement = document.getElementById(agentName + '-control-status');
+                if (statusElement && statusElement.textContent !== 'Resetting') {
+                    statusElement.textContent = formatAgentStatus(agents[agentName]);
+                }
+            }
+        })
+        .catch(function(error) {
+            console.error('Error loading agent counters:', error);
+        });
+}
+
 // Tab switching functionality
 function showTab(tabName) {
     // Hide all tabs
@@ -332,6 +478,34 @@ function updatePerformanceChart(metrics) {
     }
 }
 
+// Draw the last hour of CPU and memory usage from /api/metrics/history
+function loadPerformanceHistory() {
+    fetch('/api/metrics/history?metrics=cpu_usage,memory_usage&window=3600&max_points=120')
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(data) {
+            var start = data.start;
+            var span = Math.max(1, data.end - data.start);
+            ['cpu_usage', 'memory_usage'].forEach(function(metric) {
+                var line = document.getElementById('history-' + metric.replace('_usage', ''));
+                if (!line) {
+                    return;
+                }
+                var means = data.series[metric].mean;
+                var points = data.timestamps.map(function(timestamp, i) {
+                    var x = ((timestamp - start) / span) * 300;
+                    var y = 80 - Math.min(100, Math.max(0, means[i])) * 0.8;
+                    return x.toFixed(1) + ',' + y.toFixed(1);
+                });
+                line.setAttribute('points', points.join(' '));
+            });
+        })
+        .catch(function(error) {
+            console.error('Error loading metrics history:', error);
+        });
+}
+
 // Update agent statuses
 function updateAgentStatuses(agents) {
     var agentItems = document.querySelectorAll('#agent-status-list .agent-item');
@@ -489,10 +663,10 @@ function addThreatEvent(threat) {
     
     var timestamp = new Date(threat.timestamp).toLocaleString();
     
-    eventItem.innerHTML = 
-        '<div class="event-time">' + timestamp + '</div>' +
-        '<div class="event-type">' + threat.description + '</div>' +
-        '<div class="event-status ' + threat.severity + '">' + threat.severity.toUpperCase() + '</div>';
+    var severity = severityClass(threat.severity);
+    eventItem.appendChild(createTextElement('div', 'event-time', timestamp));
+    eventItem.appendChild(createTextElement('div', 'event-type', threat.description));
+    eventItem.appendChild(createTextElement('div', 'event-status ' + severity, severity.toUpperCase()));
     
     eventList.insertBefore(eventItem, eventList.firstChild);
     
@@ -548,16 +722,90 @@ function showNotification(message) {
     }, 3000);
 }
 
-// Start real-time updates
+// Merge a status delta from the stream into the current data
+function mergeStatusDelta(target, delta) {
+    for (var key in delta) {
+        var value = delta[key];
+        if (value !== null && typeof value === 'object' && !Array.isArray(value) &&
+                target[key] !== null && typeof target[key] === 'object') {
+            mergeStatusDelta(target[key], value);
+        } else {
+            target[key] = value;
+        }
+    }
+}
+
+// Start real-time updates, preferring the server-push stream
 function startRealTimeUpdates() {
-    updateInterval = setInterval(updateStatus, 3000);
+    if (window.EventSource) {
+        connectStatusStream();
+    } else {
+        startPolling();
+    }
 }
 
-// Stop real-time updates
-function stopRealTimeUpdates() {
+// Subscribe to /api/status/stream (full snapshot first, then deltas)
+function connectStatusStream() {
+    if (statusStream) {
+        return;
+    }
+    statusStream = new EventSource('/api/status/stream');
+
+    statusStream.addEventListener('snapshot', function(event) {
+        var message = JSON.parse(event.data);
+        stopPolling();
+        streamRetryDelay = 5000;
+        currentData = message.data;
+        updateUI(currentData);
+    });
+
+    statusStream.addEventListener('delta', function(event) {
+        var message = JSON.parse(event.data);
+        mergeStatusDelta(currentData, message.data);
+        updateUI(currentData);
+    });
+
+    statusStream.onerror = function() {
+        // Poll while the browser reconnects; the next snapshot stops polling again
+        startPolling();
+        if (statusStream && statusStream.readyState === EventSource.CLOSED) {
+            // The browser gave up (e.g. the server restarted or refused the stream); the poll loop retries later
+            statusStream.close();
+            statusStream = null;
+            streamRetryAt = Date.now() + streamRetryDelay;
+            streamRetryDelay = Math.min(streamRetryDelay * 2, 60000);
+        }
+    };
+}
+
+// Fallback polling of /api/status, reopening the stream once its retry delay has passed
+function startPolling() {
+    if (!updateInterval) {
+        updateInterval = setInterval(pollStatus, 3000);
+    }
+}
+
+function pollStatus() {
+    updateStatus();
+    if (!statusStream && window.EventSource && Date.now() >= streamRetryAt) {
+        connectStatusStream();
+    }
+}
+
+function stopPolling() {
     if (updateInterval) {
         clearInterval(updateInterval);
+        updateInterval = null;
+    }
+}
+
+// Stop real-time updates
+function stopRealTimeUpdates() {
+    if (statusStream) {
+        statusStream.close();
+        statusStream = null;
     }
+    stopPolling();
 }
 
 // Navigation event listeners
@@ -0,0 +1,57 @@
+# status_cache.py
+import gzip
+import json
+import threading
+from email.utils import formatdate
+
+
+class CachedStatus:
+    """One serialized /api/status body with its validators and lazily built gzip variant."""
+
+    __slots__ = ("version", "body", "etag", "last_modified", "_gzip_body", "_lock")
+
+    def __init__(self, version, body, etag, last_modified):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self._gzip_body = None
+        self._lock = threading.Lock()
+
+    def gzip_body(self):
+        """Compresses the body at most once per version."""
+        if self._gzip_body is None:
+            with self._lock:
+                if self._gzip_body is None:
+                    self._gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip_body
+
+
+class StatusCache:
+    """
+    Caches the serialized /api/status response per state version, so requests
+    between state changes reuse the same bytes, ETag and compressed body instead
+    of rebuilding and re-encoding the payload every time. The validators come from
+    the engine (its instance id and the time the version was published), so every
+    worker process sends the same ETag and Last-Modified for the same version.
+    """
+
+    def __init__(self, load_status):
+        # Returns (version, payload, engine instance id, changed_at), or None if unchanged since the given version
+        self._load_status = load_status
+        self._current = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        current = self._current
+        update = self._load_status(current.version if current else None)
+        if update is None:
+            return current
+        version, payload, instance_id, changed_at = update
+        with self._lock:
+            if self._current is not None and self._current.version >= version:
+                return self._current
+            body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+            # The instance id keeps ETags distinct across engine restarts, when versions start over
+            self._current = CachedStatus(version, body, f'"{instance_id}-{version}"', formatdate(changed_at, usegmt=True))
+            return self._current
@@ -0,0 +1,142 @@
+# status_stream.py
+import json
+import queue
+import threading
+import time
+
+_MISSING = object()
+
+
+def diff_status(old, new):
+    """
+    Returns the nested dict of fields in `new` that differ from `old`.
+    Returns None when a key disappeared, since a delta cannot express removals
+    and the caller should fall back to a full snapshot.
+    """
+    if old.keys() - new.keys():
+        return None
+    changes = {}
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested = diff_status(previous, value)
+            if nested is None:
+                return None
+            if nested:
+                changes[key] = nested
+        elif value != previous:
+            changes[key] = value
+    return changes
+
+
+class StatusBroadcaster:
+    """
+    Fans out /api/status payloads to Server-Sent Events subscribers.
+    Every publish is diffed against the previous one so clients only receive
+    the fields that changed, with a full snapshot every `snapshot_every` publishes
+    (and whenever a client connects or falls behind).
+
+    Each open stream holds a server thread under a threaded worker, so at most
+    `max_subscribers` streams are served at once (None for no limit), and each
+    stream ends after `max_stream_seconds`; EventSource clients reconnect on their own.
+    """
+
+    def __init__(self, snapshot_every=20, subscriber_queue_size=16, heartbeat_seconds=15,
+                 max_subscribers=None, max_stream_seconds=None):
+        self.snapshot_every = snapshot_every
+        self.subscriber_queue_size = subscriber_queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self.max_stream_seconds = max_stream_seconds
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._last_payload = None
+        self._last_state_version = None
+        self._version = 0
+        self._publishes_since_snapshot = 0
+
+    @property
+    def has_payload(self):
+        return self._last_payload is not None
+
+    def _format(self, kind, payload):
+        data = json.dumps({"version": self._version, "data": payload}, separators=(",", ":"))
+        return f"id: {self._version}\nevent: {kind}\ndata: {data}\n\n"
+
+    def subscribe(self):
+        """
+        Registers a new client queue, primed with the current full snapshot.
+        Returns None when `max_subscribers` streams are already open.
+        """
+        subscriber = queue.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+            if self._last_payload is not None:
+                subscriber.put_nowait(self._format("snapshot", self._last_payload))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, payload, state_version=None):
+        """
+        Publishes a new status payload; a no-op when nothing changed.
+        Passing the state version it was built from lets concurrent publishers
+        race safely: a payload older than the last one published is dropped.
+        """
+        with self._lock:
+            if state_version is not None:
+                if self._last_state_version is not None and state_version <= self._last_state_version:
+                    return
+                self._last_state_version = state_version
+            delta = None if self._last_payload is None else diff_status(self._last_payload, payload)
+            if delta == {}:
+                return
+            self._version += 1
+            self._publishes_since_snapshot += 1
+            self._last_payload = payload
+            snapshot = None
+            if delta is None or self._publishes_since_snapshot >= self.snapshot_every:
+                self._publishes_since_snapshot = 0
+                snapshot = event = self._format("snapshot", payload)
+            else:
+                event = self._format("delta", delta)
+
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # Slow client: discard its backlog and resync it with a snapshot
+                    while not subscriber.empty():
+                        try:
+                            subscriber.get_nowait()
+                        except queue.Empty:
+                            break
+                    if snapshot is None:
+                        snapshot = self._format("snapshot", payload)
+                    subscriber.put_nowait(snapshot)
+
+    def events(self, subscriber=None):
+        """
+        Generator of SSE frames for one client (a queue from subscribe(), or a new one),
+        with keep-alive comments while idle, until `max_stream_seconds` have passed.
+        """
+        if subscriber is None:
+            subscriber = self.subscribe()
+        deadline = None if self.max_stream_seconds is None else time.monotonic() + self.max_stream_seconds
+        try:
+            while True:
+                timeout = self.heartbeat_seconds
+                if deadline is not None:
+                    timeout = min(timeout, deadline - time.monotonic())
+                    if timeout <= 0:
+                        return
+                try:
+                    yield subscriber.get(timeout=timeout)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,174 @@
+# threat_store.py
+import bisect
+import threading
+import time
+from collections import deque
+
+
+class ThreatIdGenerator:
+    """
+    Issues threat ids "threat_<n>" with n strictly increasing: the current time in
+    microseconds, or one past the last id issued when that is later. Ids are unique
+    however many threats arrive per second, and a batch reserves its ids under one
+    lock acquisition. observe() recovered ids so a restart never reissues one.
+    """
+
+    PREFIX = "threat_"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = 0
+
+    def reserve(self, count):
+        """Returns `count` new ids in increasing order."""
+        with self._lock:
+            first = max(self._last + 1, time.time_ns() // 1000)
+            self._last = first + count - 1
+        return [f"{self.PREFIX}{n}" for n in range(first, first + count)]
+
+    def observe(self, threat_id):
+        """Accounts for an id issued by an earlier run; ids in other formats are ignored."""
+        suffix = str(threat_id)[len(self.PREFIX):]
+        if str(threat_id).startswith(self.PREFIX) and suffix.isdigit():
+            with self._lock:
+                self._last = max(self._last, int(suffix))
+
+
+class ThreatStore:
+    """
+    Bounded in-memory store for threat events.
+    Threats live in a ring buffer capped at `capacity`; once full, the oldest
+    threat is evicted on every insert. Each threat gets a monotonically
+    increasing sequence number, which doubles as the pagination cursor, and is
+    indexed by severity, type, source and arrival time.
+    """
+
+    INDEXED_FIELDS = ("severity", "type", "source")
+
+    def __init__(self, capacity=10000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._threats = deque()     # Oldest first; threat i has sequence number _first_seq + i
+        self._timestamps = deque()  # Arrival time (epoch seconds), parallel to _threats
+        self._first_seq = 0
+        self._next_seq = 0
+        self._by_id = {}
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}  # field -> value -> deque of sequence numbers
+
+    def __len__(self):
+        return len(self._threats)
+
+    def add(self, threat, timestamp=None):
+        """Stores a threat dict and returns its sequence number."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            return self._insert(threat, timestamp)
+
+    def add_many(self, threats, timestamps=None):
+        """Stores a batch of threats under one lock acquisition; returns the first sequence number."""
+        if timestamps is None:
+            timestamps = [time.time()] * len(threats)
+        with self._lock:
+            first_seq = self._next_seq
+            for threat, timestamp in zip(threats, timestamps):
+                self._insert(threat, timestamp)
+            return first_seq
+
+    def _insert(self, threat, timestamp):
+        if len(self._threats) >= self.capacity:
+            self._evict_oldest()
+        seq = self._next_seq
+        self._next_seq += 1
+        # Arrival times only move forward so the time index stays sorted
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            timestamp = self._timestamps[-1]
+        self._threats.append(threat)
+        self._timestamps.append(timestamp)
+        self._by_id[threat.get("id")] = seq
+        for field, index in self._indexes.items():
+            index.setdefault(threat.get(field), deque()).append(seq)
+        return seq
+
+    def _evict_oldest(self):
+        threat = self._threats.popleft()
+        self._timestamps.popleft()
+        seq = self._first_seq
+        self._first_seq += 1
+        if self._by_id.get(threat.get("id")) == seq:
+            del self._by_id[threat.get("id")]
+        for field, index in self._indexes.items():
+            value = threat.get(field)
+            seqs = index[value]
+            seqs.popleft() # The oldest threat is always at the front of its index lists
+            if not seqs:
+                del index[value]
+
+    def get(self, threat_id):
+        with self._lock:
+            seq = self._by_id.get(threat_id)
+            if seq is None:
+                return None
+            return dict(self._threats[seq - self._first_seq])
+
+    def update(self, threat_id, **fields):
+        """Updates non-indexed fields (such as status) of a stored threat."""
+        if any(field in self.INDEXED_FIELDS for field in fields):
+            raise ValueError("indexed fields cannot be updated")
+        with self._lock:
+            seq = self._by_id.get(threat_id)
+            if seq is None:
+                return False
+            self._threats[seq - self._first_seq].update(fields)
+            return True
+
+    def all(self):
+        """Returns copies of every retained threat, oldest first."""
+        with self._lock:
+            return [dict(threat) for threat in self._threats]
+
+    def query(self, severity=None, type=None, source=None, since=None, until=None, cursor=None, limit=10):
+        """
+        Returns (threats, next_cursor) with the newest matching threats first.
+        `since`/`until` are epoch seconds (inclusive); `cursor` is the
+        next_cursor of a previous page. next_cursor is None on the last page.
+        """
+        limit = max(1, limit)
+        filters = {field: value for field, value in
+                   (("severity", severity), ("type", type), ("source", source)) if value is not None}
+        with self._lock:
+            first_seq = self._first_seq
+            lo = first_seq
+            hi = self._next_seq
+            if cursor is not None:
+                hi = min(hi, cursor)
+            if since is not None:
+                lo = max(lo, first_seq + bisect.bisect_left(self._timestamps, since))
+            if until is not None:
+                hi = min(hi, first_seq + bisect.bisect_right(self._timestamps, until))
+
+            if filters:
+                # Walk the smallest matching index and check the remaining filters per threat
+                candidates = [self._indexes[field].get(value, ()) for field, value in filters.items()]
+                seqs = min(candidates, key=len)
+                end = bisect.bisect_left(seqs, hi)
+                positions = (seqs[i] for i in range(end - 1, -1, -1))
+            else:
+                positions = iter(range(hi - 1, lo - 1, -1))
+
+            matches = []
+            for seq in positions:
+                if seq < lo:
+                    break
+                threat = self._threats[seq - first_seq]
+                if all(threat.get(field) == value for field, value in filters.items()):
+                    matches.append((seq, dict(threat)))
+                    if len(matches) > limit:
+                        break
+
+        next_cursor = None
+        if len(matches) > limit:
+            matches = matches[:limit]
+            next_cursor = matches[-1][0]
+        return [threat for _, threat in matches], next_cursor